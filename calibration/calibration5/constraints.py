@@ -1,6 +1,5 @@
 from timefold.solver.score import constraint_provider, HardSoftScore, ConstraintFactory, Joiners
 from domain import Device
-from datetime import datetime, timedelta
 
 
 @constraint_provider
@@ -56,17 +55,8 @@ def technician_skill_conflict(constraint_factory: ConstraintFactory):
 
 def minimize_completion_time(constraint_factory: ConstraintFactory):
     # Minimize the average completion time for all devices.
-    def calculate_days_between(device: Device):
-        delivery_date = datetime.strptime(device.delivery_date, "%Y%m%d").date()
-
-        # Map day_of_week to a date
-        days_of_week = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-        first_monday = datetime(2024, 7, 1)  # The first Monday of July 2024
-        timeslot_date = first_monday + timedelta(days=days_of_week.index(device.timeslot.day_of_week))
-
-        return (timeslot_date.date() - delivery_date).days
-
+    # Day numbers are precomputed by domain.assign_day_numbers, so no dates are built during score calculation.
     return (constraint_factory
             .for_each(Device)
-            .penalize(HardSoftScore.ONE_SOFT, calculate_days_between)
+            .penalize(HardSoftScore.ONE_SOFT, lambda device: device.timeslot.day_number - device.delivery_day)
             .as_constraint("Minimize completion time"))
@@ -7,6 +7,9 @@ from timefold.solver.score import HardSoftScore
 from dataclasses import dataclass, field
 from typing import Annotated
 
+DAYS_OF_WEEK = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+FIRST_MONDAY = datetime(2024, 7, 1).date()  # The first Monday of July 2024, day number 0
+
 @dataclass
 class Technician:
     id: Annotated[int, PlanningId]
@@ -37,6 +40,7 @@ class Timeslot:
     day_of_week: str
     start_time: time
     end_time: time
+    day_number: int = field(default=0)  # Weekday index (0 = Monday), set by assign_day_numbers
 
     def __str__(self):
         return (
@@ -56,6 +60,7 @@ class Device:
     required_skill: str
     serial_number: str
     delivery_date: str
+    delivery_day: int = field(default=0)  # Delivery date in days since FIRST_MONDAY, set by assign_day_numbers
     technician: Annotated[Technician | None, PlanningVariable] = field(default=None)
     workstation: Annotated[Workstation | None, PlanningVariable] = field(default=None)
     timeslot: Annotated[Timeslot | None, PlanningVariable] = field(default=None)
@@ -97,3 +102,12 @@ class DeviceSchedule:
             f")"
         )
 
+
+def assign_day_numbers(schedule: DeviceSchedule) -> DeviceSchedule:
+    # Convert weekdays and delivery dates to integer day numbers once, so that constraints only read integers.
+    day_numbers = {day: number for number, day in enumerate(DAYS_OF_WEEK)}
+    for timeslot in schedule.timeslot_list:
+        timeslot.day_number = day_numbers[timeslot.day_of_week]
+    for device in schedule.device_list:
+        device.delivery_day = (datetime.strptime(device.delivery_date, "%Y%m%d").date() - FIRST_MONDAY).days
+    return schedule
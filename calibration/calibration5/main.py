@@ -3,7 +3,7 @@ from functools import reduce
 from timefold.solver.config import SolverConfig, ScoreDirectorFactoryConfig, TerminationConfig, Duration
 from timefold.solver import SolverFactory
 from constraints import define_constraints  # Upewnij się, że to jest odpowiedniego typu (klasa/funkcja)
-from domain import DeviceSchedule, Device, Technician, Workstation, Timeslot
+from domain import DeviceSchedule, Device, Technician, Workstation, Timeslot, assign_day_numbers
 
 def generate_problem(window_width_minutes=60):
     timeslot_list = []
@@ -41,7 +41,7 @@ def generate_problem(window_width_minutes=60):
         Device(9, "Device9", "type2", "skill2", "SN9", "20230709"),
         Device(10, "Device10", "type2", "skill2", "SN10", "20230710")
     ]
-    return DeviceSchedule("schedule1", timeslot_list, technician_list, workstation_list, device_list)
+    return assign_day_numbers(DeviceSchedule("schedule1", timeslot_list, technician_list, workstation_list, device_list))
 
 
 def print_schedule(schedule: DeviceSchedule):
@@ -60,11 +60,7 @@ def print_schedule(schedule: DeviceSchedule):
                 slot_task_map[timeslot_id] = []
             slot_task_map[timeslot_id].append(task)
 
-            delivery_date = datetime.strptime(task.delivery_date, "%Y%m%d").date()
-            days_of_week = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-            first_monday = datetime(2024, 7, 1)
-            timeslot_date = first_monday + timedelta(days=days_of_week.index(task.timeslot.day_of_week))
-            total_days += (timeslot_date.date() - delivery_date).days
+            total_days += task.timeslot.day_number - task.delivery_day
             completed_tasks += 1
 
     average_completion_time = total_days / completed_tasks if completed_tasks > 0 else 0
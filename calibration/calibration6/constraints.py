@@ -1,6 +1,5 @@
 from timefold.solver.score import constraint_provider, HardSoftScore, ConstraintFactory, Joiners
 from domain import Device
-from datetime import datetime
 
 @constraint_provider
 def define_constraints(constraint_factory: ConstraintFactory):
@@ -50,12 +49,8 @@ def technician_skill_conflict(constraint_factory: ConstraintFactory):
 
 def minimize_completion_time(constraint_factory: ConstraintFactory):
     # Minimize the average completion time for all devices.
-    def calculate_days_between(device: Device):
-        delivery_date = datetime.strptime(device.delivery_date, "%Y%m%d").date()
-        timeslot_date = datetime.strptime(device.timeslot.date, "%Y-%m-%d").date()
-        return (timeslot_date - delivery_date).days
-
+    # Day numbers are precomputed by domain.assign_day_numbers, so no dates are parsed during score calculation.
     return (constraint_factory
             .for_each(Device)
-            .reward(HardSoftScore.ONE_SOFT, calculate_days_between)
+            .reward(HardSoftScore.ONE_SOFT, lambda device: device.timeslot.day_number - device.delivery_day)
             .as_constraint("Minimize completion time"))
@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta, time
+from datetime import datetime, timedelta, time, date
 from timefold.solver.domain import (planning_entity, planning_solution, PlanningId, PlanningVariable,
                                     PlanningEntityCollectionProperty,
                                     ProblemFactCollectionProperty, ValueRangeProvider,
@@ -48,6 +48,7 @@ class Timeslot:
     date: str
     start_time: time
     end_time: time
+    day_number: int = field(default=0)  # Days since the reference date, set by assign_day_numbers
 
     def __str__(self):
         return (
@@ -68,6 +69,7 @@ class Device:
     serial_number: str
     delivery_date: str
     time_for_service: float
+    delivery_day: int = field(default=0)  # Delivery date in days since the reference date, set by assign_day_numbers
     technician: Annotated[Technician | None, PlanningVariable(value_range_provider_refs=["technicianRange"])] = field(default=None)
     workstation: Annotated[Workstation | None, PlanningVariable(value_range_provider_refs=["workstationRange"])] = field(default=None)
     timeslot: Annotated[Timeslot | None, PlanningVariable(value_range_provider_refs=["timeslotRange"])] = field(default=None)
@@ -109,3 +111,15 @@ class DeviceSchedule:
             f"score={self.score}"
             f")"
         )
+
+
+def assign_day_numbers(schedule: DeviceSchedule, reference_date: date | None = None) -> DeviceSchedule:
+    # Convert timeslot and delivery dates to integer day numbers once, so that constraints only read integers.
+    # The reference date (by default the first timeslot date) is fixed for the whole solve.
+    if reference_date is None:
+        reference_date = min(datetime.strptime(timeslot.date, "%Y-%m-%d").date() for timeslot in schedule.timeslot_list)
+    for timeslot in schedule.timeslot_list:
+        timeslot.day_number = (datetime.strptime(timeslot.date, "%Y-%m-%d").date() - reference_date).days
+    for device in schedule.device_list:
+        device.delivery_day = (datetime.strptime(device.delivery_date, "%Y%m%d").date() - reference_date).days
+    return schedule
@@ -2,7 +2,7 @@ from datetime import datetime, timedelta, time
 from functools import reduce
 from timefold.solver.config import SolverConfig, ScoreDirectorFactoryConfig, TerminationConfig, Duration
 from timefold.solver import SolverFactory
-from domain import DeviceSchedule, Device, Technician, Workstation, Timeslot
+from domain import DeviceSchedule, Device, Technician, Workstation, Timeslot, assign_day_numbers
 from constraints import define_constraints
 
 def generate_timeslots(start_date, end_date, interval_minutes):
@@ -49,7 +49,7 @@ def generate_problem():
         Device(10, "Device10", "type2", "skill2", "SN10", 30)
     ]
 
-    return DeviceSchedule("schedule1", timeslot_list, technician_list, workstation_list, device_list)
+    return assign_day_numbers(DeviceSchedule("schedule1", timeslot_list, technician_list, workstation_list, device_list))
 
 def print_schedule(schedule: DeviceSchedule):
     technician_list = schedule.technician_list
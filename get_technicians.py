@@ -1,12 +1,13 @@
 from tools.ODBCDataLoader import DataLoader
 
 
-dataloader = DataLoader()
-pers_gr = dataloader.pers_gr
-pers_st = dataloader.pers_st
-
+def load_personal_tables():
+    dataloader = DataLoader()
+    dataloader.prefetch(['pers_gr', 'pers_st'])
+    return dataloader.pers_gr, dataloader.pers_st
 
 
 if __name__ == '__main__':
+    pers_gr, pers_st = load_personal_tables()
     print(pers_gr)
     print(pers_st)
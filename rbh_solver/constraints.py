@@ -1,9 +1,7 @@
 from timefold.solver.score import constraint_provider, HardSoftScore, ConstraintFactory, Joiners, ConstraintCollectors
 from rbh_solver.domain import Device, Technician
-from datetime import datetime
 
-@constraint_provider
-def define_constraints(constraint_factory: ConstraintFactory):
+def define_constraint_list(constraint_factory: ConstraintFactory):
     return [
         # HARD
         technician_capacity_hard(constraint_factory),
@@ -16,6 +14,11 @@ def define_constraints(constraint_factory: ConstraintFactory):
     ]
 
 
+@constraint_provider
+def define_constraints(constraint_factory: ConstraintFactory):
+    return define_constraint_list(constraint_factory)
+
+
 def technician_skill_conflict(constraint_factory: ConstraintFactory):
     return (constraint_factory
             .for_each(Device)
@@ -61,18 +64,17 @@ def assign_technician_soft_constraint(constraint_factory: ConstraintFactory):
 def prioritize_earlier_deliveries(constraint_factory: ConstraintFactory):
     return (constraint_factory
             .for_each(Device)
-            .filter(lambda device: device.pesel is not None)  # Tylko przydzielone przyrządy
+            .filter(lambda device: device.technician is not None)  # Tylko przydzielone przyrządy
             .reward(HardSoftScore.ONE_SOFT,
-                    lambda device: days_until_delivery(device.data_dostawy))  # Nagroda za wcześniejsze przypisanie
+                    days_until_delivery)  # Nagroda za wcześniejsze przypisanie
             .as_constraint("Prioritize earlier deliveries"))
 
-def days_until_delivery(data_dostawy: str) -> int:
-    print(f'data_dostawy={data_dostawy}')
-    today = datetime.now()#.date()
-    print(f'today={today}')
-    delivery_date = datetime.strptime(data_dostawy, "%Y-%m-%d").date()
-    print(f'delivery_date={delivery_date}')
-    return max(0, (today - delivery_date).days)
+def days_until_delivery(device: Device) -> int:
+    """
+    Liczba dni od dostawy (dni_w_om), policzona raz przy przygotowaniu danych względem jednej daty odniesienia;
+    ograniczenie odczytuje tylko tę liczbę, bez odczytu zegara i parsowania dat przy każdym obliczeniu wyniku.
+    """
+    return max(0, device.dni_w_om)
 
 
 
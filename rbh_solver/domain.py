@@ -1,5 +1,6 @@
 from dataclasses import dataclass, field
-from typing import Annotated, Set, List, Dict, Union
+from functools import lru_cache
+from typing import Annotated, Set, List, Dict, Union, Tuple
 from datetime import datetime
 from pandas import DataFrame
 import pandas as pd
@@ -7,9 +8,6 @@ from timefold.solver.domain import PlanningId, planning_entity, planning_solutio
     PlanningEntityCollectionProperty, ProblemFactCollectionProperty, ValueRangeProvider, PlanningScore
 from timefold.solver.score import HardSoftScore
 
-# Import danych z istniejących skryptów
-from tools.df_merges import technicians, devices_in_bok_to_assign
-
 
 @dataclass
 class Technician:
@@ -66,43 +64,60 @@ class DeviceSchedule:
         )
 
 
-# Funkcja tworząca techników z dataframe
-def _create_technician(index: int, row: Dict[str, Union[int, str, float, Set[str]]]) -> Technician:
-    return Technician(
-        id=index,
-        name=row['technician'],  # zmiana na 'technician'
-        rbh_do_zaplanowania=row['rbh_do_zaplanowania'],
-        rbh_przydzielone=row['rbh_przydzielone'],
-        iums=set(row['iums'])  # zestaw unikalnych ium
-    )
-
-
-# Funkcja tworząca urządzenia z dataframe
-def _create_device(index: int, row: Dict) -> Device:
-    technician_value = row.get('technician', None)
-    technician = next((t for t in technicians_list if t.name == technician_value), None) if pd.notna(technician_value) else None
-
-    return Device(
-        index=index,
-        ium=row['ium'],
-        nazwa=row['nazwa'],
-        typ=row['typ'],
-        nr_fabryczny=row['nr_fabryczny'],
-        rbh_norma=row['rbh_norma'],
-        dni_w_om=row['dni_w_om'],
-        uzytkownik=row['uzytkownik'],
-        technician=technician
-    )
-
-
-# Funkcja generująca techników z dataframe
+# Funkcja generująca techników z dataframe, kolumny są konwertowane w całości zamiast iterrows
 def generate_technicians(technicians: DataFrame) -> List[Technician]:
-    return [_create_technician(index, row) for index, row in technicians.iterrows()]
-
-
-# Funkcja generująca urządzenia z dataframe
-def generate_devices(devices: DataFrame) -> List[Device]:
-    return [_create_device(index, row) for index, row in devices.iterrows()]
+    return [
+        Technician(id=index, name=name, rbh_do_zaplanowania=rbh_do_zaplanowania,
+                   rbh_przydzielone=rbh_przydzielone, iums=set(iums))  # zestaw unikalnych ium
+        for index, name, rbh_do_zaplanowania, rbh_przydzielone, iums in zip(
+            technicians.index.tolist(),
+            technicians['technician'].tolist(),
+            technicians['rbh_do_zaplanowania'].tolist(),
+            technicians['rbh_przydzielone'].tolist(),
+            technicians['iums'].tolist()
+        )
+    ]
+
+
+class TechnicianRegistry:
+    """
+    Rejestr techników indeksowany po id i nazwie.
+    Wyszukanie technika przypisanego do urządzenia jest O(1), więc wiązanie przypisań jest liniowe.
+    """
+
+    def __init__(self, technicians: List[Technician]):
+        self.by_id: Dict[int, Technician] = {technician.id: technician for technician in technicians}
+        self.by_name: Dict[str, Technician] = {}
+        for technician in technicians:
+            # przy powtórzonej nazwie wygrywa pierwszy technik, jak przy wyszukiwaniu liniowym
+            self.by_name.setdefault(technician.name, technician)
+
+    def find_by_name(self, name) -> Technician | None:
+        return self.by_name.get(name) if pd.notna(name) else None
+
+    def find_by_id(self, technician_id) -> Technician | None:
+        return self.by_id.get(technician_id) if pd.notna(technician_id) else None
+
+
+# Funkcja generująca urządzenia z dataframe, kolumny są konwertowane w całości zamiast iterrows
+def generate_devices(devices: DataFrame, technician_registry: TechnicianRegistry) -> List[Device]:
+    assigned_technicians = devices['technician'].tolist() if 'technician' in devices.columns else [None] * len(devices)
+    return [
+        Device(index=index, ium=ium, nazwa=nazwa, typ=typ, nr_fabryczny=nr_fabryczny, rbh_norma=rbh_norma,
+               dni_w_om=dni_w_om, uzytkownik=uzytkownik,
+               technician=technician_registry.find_by_name(technician_value))
+        for index, ium, nazwa, typ, nr_fabryczny, rbh_norma, dni_w_om, uzytkownik, technician_value in zip(
+            devices.index.tolist(),
+            devices['ium'].tolist(),
+            devices['nazwa'].tolist(),
+            devices['typ'].tolist(),
+            devices['nr_fabryczny'].tolist(),
+            devices['rbh_norma'].tolist(),
+            devices['dni_w_om'].tolist(),
+            devices['uzytkownik'].tolist(),
+            assigned_technicians
+        )
+    ]
 
 
 # Funkcja drukująca techników i urządzenia
@@ -113,10 +128,22 @@ def print_datatables(devices: List[Device], technicians: List[Technician]):
         print(technician)
 
 
-# Tworzenie list
-devices_list = generate_devices(devices_in_bok_to_assign)  # zmiana na devices_in_bok_to_assign
-technicians_list = generate_technicians(technicians)
+# Wczytanie danych z istniejących skryptów, zapamiętywane w procesie; import modułu nie wykonuje operacji wejścia/wyjścia
+@lru_cache(maxsize=None)
+def load_problem_data(use_archive_data: bool = False) -> Tuple[DataFrame, DataFrame]:
+    from tools.df_merges import get_technician_and_device_data
+    return get_technician_and_device_data(use_archive_data=use_archive_data)
+
+
+# Tworzenie list techników i urządzeń, przy każdym wywołaniu nowe obiekty
+def load_problem(use_archive_data: bool = False) -> Tuple[List[Technician], List[Device]]:
+    technicians, devices_in_bok_to_assign = load_problem_data(use_archive_data)
+    technicians_list = generate_technicians(technicians)
+    devices_list = generate_devices(devices_in_bok_to_assign, TechnicianRegistry(technicians_list))
+    return technicians_list, devices_list
+
 
 # Przetwarzanie
 if __name__ == '__main__':
+    technicians_list, devices_list = load_problem()
     print_datatables(devices_list, technicians_list)
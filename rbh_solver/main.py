@@ -1,8 +1,11 @@
 from datetime import datetime, timedelta, time
 from timefold.solver.config import SolverConfig, ScoreDirectorFactoryConfig, TerminationConfig, Duration
 from timefold.solver import SolverFactory
+from rbh_solver import constraints
 from rbh_solver.constraints import define_constraints
-from rbh_solver.domain import DeviceSchedule, Device, devices_list, technicians_list
+from rbh_solver.domain import DeviceSchedule, Device, load_problem
+from tools.constraint_profiler import ConstraintProfiler
+from tools.settings import PROFILE_CONSTRAINTS, CONSTRAINT_PROFILE_FORMAT
 
 
 def generate_problem(technicians_list, devices_list):
@@ -50,13 +53,19 @@ def on_best_solution_change(event):
     print(f"Hard score: {-best_solution.score.hard_score}, Soft score: {best_solution.score.soft_score}")
 
 
+if __name__ == '__main__':
+    technicians_list, devices_list = load_problem()
+
+    # Profilowanie ograniczeń włączane przez PROFILE_CONSTRAINTS
+    profiler = ConstraintProfiler() if PROFILE_CONSTRAINTS else None
+
     # Konfiguracja solvera
     solver_factory = SolverFactory.create(
         SolverConfig(
             solution_class=DeviceSchedule,
             entity_class_list=[Device],
             score_director_factory_config=ScoreDirectorFactoryConfig(
-                constraint_provider_function=define_constraints
+                constraint_provider_function=profiler.constraint_provider(constraints) if profiler else define_constraints
             ),
             termination_config=TerminationConfig(
                 spent_limit=Duration(seconds=60)
@@ -77,3 +86,6 @@ def on_best_solution_change(event):
 
     # Print the solution
     print_solution(solution, extended=False)
+
+    if profiler:
+        print(profiler.report(CONSTRAINT_PROFILE_FORMAT))
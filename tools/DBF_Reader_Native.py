@@ -0,0 +1,436 @@
+"""
+Natywny odczyt tabel Visual FoxPro (DBF + FPT) bez sterownika ODBC i bez 32-bitowego interpretera.
+
+Rekordy DBF mają stałą szerokość, więc cały obszar danych jest odczytywany jako macierz bajtów
+(liczba rekordów x długość rekordu), a każde pole jest dekodowane kolumnowo do tablicy NumPy.
+"""
+from typing import Dict, List, Optional, Tuple, Any
+from dataclasses import dataclass
+from datetime import date
+import mmap
+import os
+import struct
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+import tools.settings
+from tools.DBF_Reader_ODBC import convert_columns_to_numeric, convert_columns_to_date, get_filter_mask
+
+DBF_HEADER_SIZE = 32
+FIELD_DESCRIPTOR_SIZE = 32
+HEADER_TERMINATOR = 0x0D
+DELETED_FLAG = ord('*')
+JULIAN_DAY_UNIX_EPOCH = 2440588  # dzień juliański odpowiadający 1970-01-01
+MILLISECONDS_PER_DAY = 86400000
+
+FIELD_FLAG_SYSTEM = 0x01
+FIELD_FLAG_NULLABLE = 0x02
+
+MEMO_FIELD_TYPES = ('M', 'G', 'W')
+VARLENGTH_FIELD_TYPES = ('V', 'Q')
+
+# Znacznik strony kodowej w bajcie 29 nagłówka (tylko wartości spotykane w praktyce)
+CODE_PAGE_MARKS = {
+    0x01: 'cp437',
+    0x02: 'cp850',
+    0x03: 'cp1252',
+    0x64: 'cp852',
+    0x65: 'cp866',
+    0x57: 'cp1252',
+    0xC8: 'cp1250',
+    0xC9: 'cp1251',
+}
+
+
+@dataclass
+class DBFField:
+    name: str
+    type: str
+    offset: int
+    length: int
+    decimals: int
+    flags: int
+    null_bit: Optional[int] = None
+    varlength_bit: Optional[int] = None
+
+
+@dataclass
+class DBFHeader:
+    version: int
+    last_update: Optional[date]
+    record_count: int
+    header_length: int
+    record_length: int
+    encoding: str
+    fields: List[DBFField]
+    null_flags_field: Optional[DBFField]
+
+
+def _parse_last_update(yy: int, mm: int, dd: int) -> Optional[date]:
+    """
+    Data ostatniej modyfikacji z nagłówka. VFP zapisuje rok jako liczbę lat od 1900, starsze programy jako dwie cyfry.
+    """
+    year = yy + 2000 if yy < 80 else yy + 1900
+    try:
+        return date(year, mm, dd)
+    except ValueError:
+        return None
+
+
+def read_dbf_header(dbf_file_path: str) -> DBFHeader:
+    """
+    Odczytuje nagłówek i opisy pól pliku DBF.
+    """
+    with open(dbf_file_path, 'rb') as file:
+        prefix = file.read(DBF_HEADER_SIZE)
+        if len(prefix) < DBF_HEADER_SIZE:
+            raise ValueError(f"Plik '{dbf_file_path}' jest za krótki, aby był tabelą DBF.")
+        version, yy, mm, dd, record_count, header_length, record_length = struct.unpack('<4BIHH', prefix[:12])
+        descriptors = file.read(header_length - DBF_HEADER_SIZE)
+
+    encoding = CODE_PAGE_MARKS.get(prefix[29], tools.settings.DBF_ENCODING)
+
+    fields: List[DBFField] = []
+    null_flags_field = None
+    offset = 1  # pierwszy bajt rekordu to znacznik usunięcia
+    null_bit = 0
+    for start in range(0, len(descriptors) - FIELD_DESCRIPTOR_SIZE + 1, FIELD_DESCRIPTOR_SIZE):
+        descriptor = descriptors[start:start + FIELD_DESCRIPTOR_SIZE]
+        if descriptor[0] == HEADER_TERMINATOR:
+            break
+        name = descriptor[:11].split(b'\x00')[0].decode('ascii', errors='replace').strip().lower()
+        field = DBFField(name=name, type=chr(descriptor[11]), offset=offset, length=descriptor[16],
+                         decimals=descriptor[17], flags=descriptor[18])
+        offset += field.length
+
+        if field.type == '0':
+            null_flags_field = field
+            continue
+        if field.flags & FIELD_FLAG_SYSTEM:
+            continue
+        # Bity w _NullFlags są przydzielane kolejno: najpierw bit długości (Varchar/Varbinary), potem bit NULL
+        if field.type in VARLENGTH_FIELD_TYPES:
+            field.varlength_bit = null_bit
+            null_bit += 1
+        if field.flags & FIELD_FLAG_NULLABLE:
+            field.null_bit = null_bit
+            null_bit += 1
+        fields.append(field)
+
+    return DBFHeader(version=version, last_update=_parse_last_update(yy, mm, dd), record_count=record_count,
+                     header_length=header_length, record_length=record_length, encoding=encoding,
+                     fields=fields, null_flags_field=null_flags_field)
+
+
+class FPTMemoFile:
+    """
+    Odczyt bloków pliku memo Visual FoxPro (FPT). Liczby w nagłówku i blokach są zapisane w big-endian.
+    """
+
+    def __init__(self, fpt_file_path: str, encoding: str):
+        with open(fpt_file_path, 'rb') as file:
+            self.data = file.read()
+        self.block_size = struct.unpack('>H', self.data[6:8])[0] or 1
+        self.encoding = encoding
+
+    def read(self, block: int, as_text: bool = True):
+        if block <= 0:
+            return None
+        start = block * self.block_size
+        block_type, length = struct.unpack('>II', self.data[start:start + 8])
+        content = self.data[start + 8:start + 8 + length]
+        if as_text and block_type == 1:
+            return content.decode(self.encoding, errors='replace').rstrip()
+        return content
+
+
+def find_memo_file(dbf_file_path: str) -> Optional[str]:
+    """
+    Zwraca ścieżkę pliku FPT towarzyszącego tabeli DBF (wielkość liter rozszerzenia bywa różna).
+    """
+    stem = os.path.splitext(dbf_file_path)[0]
+    for extension in ('.FPT', '.fpt', '.Fpt'):
+        if os.path.isfile(stem + extension):
+            return stem + extension
+    return None
+
+
+def _field_bytes(records: np.ndarray, field: DBFField, rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Bajty pola we wszystkich rekordach albo tylko w rekordach 'rows'; kopiowane są wyłącznie bajty tego pola.
+    """
+    field_bytes = records[:, field.offset:field.offset + field.length]
+    return np.ascontiguousarray(field_bytes) if rows is None else field_bytes[rows]
+
+
+def _decode_unique(raw: np.ndarray, decoder) -> np.ndarray:
+    """
+    Dekoduje tylko unikalne wartości kolumny bajtowej; kody i indeksy w tabelach bardzo się powtarzają.
+    """
+    codes, uniques = pd.factorize(raw)
+    decoded = np.empty(len(uniques), dtype=object)
+    decoded[:] = [decoder(value) for value in uniques]
+    return decoded[codes]
+
+
+def _null_flag_bits(records: np.ndarray, header: DBFHeader, bit: int,
+                    rows: Optional[np.ndarray] = None) -> np.ndarray:
+    null_flags = header.null_flags_field
+    byte_values = records[:, null_flags.offset + bit // 8]
+    if rows is not None:
+        byte_values = byte_values[rows]
+    return (byte_values >> (bit % 8)) & 1 == 1
+
+
+def _decode_field(records: np.ndarray, field: DBFField, header: DBFHeader, encoding: str,
+                  memo: Optional[FPTMemoFile], rows: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Dekoduje jedno pole wszystkich przekazanych rekordów (albo tylko rekordów 'rows') do tablicy NumPy.
+    """
+    raw = _field_bytes(records, field, rows)
+    field_type = field.type
+
+    if field_type in ('C', 'V'):
+        values = raw.view(f'S{field.length}').ravel()
+        if field_type == 'V' and field.varlength_bit is not None and header.null_flags_field is not None:
+            # Pole nie jest wypełnione do końca: ostatni bajt przechowuje rzeczywistą długość
+            is_partial = _null_flag_bits(records, header, field.varlength_bit, rows)
+            if is_partial.any():
+                values = values.astype(object)
+                lengths = raw[:, -1]
+                values[is_partial] = [bytes(row[:n]) for row, n in zip(raw[is_partial], lengths[is_partial])]
+        column = _decode_unique(values, lambda value: value.decode(encoding, errors='replace').strip())
+    elif field_type in ('N', 'F'):
+        values = raw.view(f'S{field.length}').ravel()
+        column = pd.to_numeric(pd.Series(_decode_unique(values, lambda value: value.strip().decode('ascii', errors='replace'))),
+                               errors='coerce').to_numpy()
+        if field.decimals == 0 and len(column) and not np.isnan(column).any():
+            column = column.astype(np.int64)
+    elif field_type == 'I':
+        column = raw.view('<i4').ravel().astype(np.int64)
+    elif field_type == 'B':
+        column = raw.view('<f8').ravel().copy()
+    elif field_type == 'Y':
+        column = raw.view('<i8').ravel() / 10000
+    elif field_type == 'D':
+        values = raw.view('S8').ravel()
+        column = pd.to_datetime(pd.Series(_decode_unique(values, lambda value: value.decode('ascii', errors='replace'))),
+                                format='%Y%m%d', errors='coerce').to_numpy()
+    elif field_type == 'T':
+        parts = raw.view('<i4').reshape(-1, 2).astype(np.int64)
+        days, milliseconds = parts[:, 0], parts[:, 1]
+        column = ((days - JULIAN_DAY_UNIX_EPOCH) * MILLISECONDS_PER_DAY + milliseconds).astype('datetime64[ms]')
+        column[days == 0] = np.datetime64('NaT')
+    elif field_type == 'L':
+        column = np.isin(raw[:, 0], np.frombuffer(b'TtYy', dtype=np.uint8))
+    elif field_type in MEMO_FIELD_TYPES:
+        if field.length == 4:
+            blocks = raw.view('<u4').ravel().astype(np.int64)
+        else:
+            blocks = pd.to_numeric(pd.Series(raw.view(f'S{field.length}').ravel()).str.strip().str.decode('ascii'),
+                                   errors='coerce').fillna(0).astype(np.int64).to_numpy()
+        column = np.empty(len(blocks), dtype=object)
+        if memo is not None:
+            as_text = field_type == 'M' and not field.flags & 0x04
+            column[:] = [memo.read(int(block), as_text) for block in blocks]
+    else:
+        # Typy nieobsługiwane (np. Q, P) są zwracane jako surowe bajty
+        column = raw.view(f'S{field.length}').ravel().astype(object)
+
+    if field.null_bit is not None and header.null_flags_field is not None:
+        is_null = _null_flag_bits(records, header, field.null_bit, rows)
+        if is_null.any():
+            if column.dtype.kind == 'M':
+                column = column.copy()
+                column[is_null] = np.datetime64('NaT')
+            elif column.dtype.kind == 'f':
+                column = column.copy()
+                column[is_null] = np.nan
+            else:
+                column = column.astype(object)
+                column[is_null] = None
+    return column
+
+
+def map_dbf_records(file_map: mmap.mmap, header: DBFHeader) -> np.ndarray:
+    """
+    Zwraca obszar rekordów zmapowanego pliku jako macierz bajtów (liczba rekordów x długość rekordu) bez kopiowania.
+    Rekordy niepełne (np. dopisywane w trakcie odczytu) są pomijane.
+    """
+    available = max(len(file_map) - header.header_length, 0)
+    record_count = min(header.record_count, available // header.record_length)
+    return np.frombuffer(file_map, dtype=np.uint8, count=record_count * header.record_length,
+                         offset=header.header_length).reshape(record_count, header.record_length)
+
+
+def _find_field(header: DBFHeader, name: str) -> DBFField:
+    for field in header.fields:
+        if field.name == name:
+            return field
+    raise KeyError(f"Kolumna '{name}' nie istnieje w tabeli DBF.")
+
+
+def _convert_empty_strings_to_none(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Puste teksty są w ścieżce CSV wczytywane jako brak wartości.
+    """
+    for column in columns.values():
+        if column.dtype == object:
+            column[column == ''] = None
+    return columns
+
+
+def _convert_columns(df: DataFrame) -> DataFrame:
+    df = convert_columns_to_string(df, tools.settings.STRING_COLUMN_LIST)
+    df = convert_columns_to_numeric(df, tools.settings.NUMERIC_COLUMN_LIST)
+    return convert_columns_to_date(df, tools.settings.DATE_COLUMN_LIST, tools.settings.DATETIME_COLUMN_LIST)
+
+
+def read_dbf_columns(dbf_file_path: str, columns: Optional[List[str]] = None,
+                     filters: Optional[List[Tuple[str, str, Any]]] = None, encoding: Optional[str] = None,
+                     include_deleted: bool = tools.settings.DBF_INCLUDE_DELETED,
+                     record_numbers: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Odczytuje tabelę DBF do słownika kolumn NumPy. Kluczem specjalnym '_recno' jest numer rekordu w pliku.
+
+    Plik jest mapowany do pamięci. Warunki (kolumna, operator, wartość) są sprawdzane kolejno, każdy tylko na
+    rekordach spełniających poprzednie, a kolumny z listy 'columns' są dekodowane wyłącznie dla wierszy wynikowych.
+    Parametr 'record_numbers' ogranicza odczyt do podanych numerów rekordów (liczonych od zera).
+    """
+    header = read_dbf_header(dbf_file_path)
+    encoding = encoding or header.encoding
+    selected_fields = header.fields if columns is None else [_find_field(header, name) for name in columns]
+    filters = filters or []
+
+    memo = None
+    memo_file_path = find_memo_file(dbf_file_path)
+    if memo_file_path and any(field.type in MEMO_FIELD_TYPES
+                              for field in selected_fields + [_find_field(header, f[0]) for f in filters]):
+        memo = FPTMemoFile(memo_file_path, encoding)
+
+    with open(dbf_file_path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size <= header.header_length:
+            return {'_recno': np.arange(0), **{field.name: np.empty(0, dtype=object) for field in selected_fields}}
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as file_map:
+            records = map_dbf_records(file_map, header)
+            if record_numbers is None:
+                record_numbers = np.arange(len(records))
+            else:
+                record_numbers = np.asarray(record_numbers, dtype=np.int64)
+                record_numbers = record_numbers[record_numbers < len(records)]
+            if not include_deleted:
+                record_numbers = record_numbers[records[:, 0][record_numbers] != DELETED_FLAG]
+
+            for name, operator, value in filters:
+                field = _find_field(header, name)
+                # Warunek jest sprawdzany na wartościach po tych samych konwersjach co w wynikowej ramce
+                column = _decode_field(records, field, header, encoding, memo, record_numbers)
+                candidates = _convert_columns(DataFrame(_convert_empty_strings_to_none({name: column})))
+                record_numbers = record_numbers[get_filter_mask(candidates, [(name, operator, value)])]
+
+            result = {'_recno': record_numbers}
+            for field in selected_fields:
+                # Indeksowane są tylko bajty pola, a nie całe rekordy
+                result[field.name] = _decode_field(records, field, header, encoding, memo, record_numbers)
+            # Widoki na mapę muszą zostać zwolnione przed jej zamknięciem
+            del records
+    return result
+
+
+@dataclass
+class DBFWatermark:
+    """
+    Stan tabeli zapamiętany przy odczycie: liczba rekordów, data modyfikacji z nagłówka, czas modyfikacji pliku
+    i znaczniki usunięcia. Pozwala odczytać później tylko rekordy dopisane i rekordy, których znacznik usunięcia
+    się zmienił.
+    """
+    record_count: int
+    record_length: int
+    last_update: Optional[date]
+    deleted: np.ndarray
+    modified_ns: Optional[int] = None  # None: czas modyfikacji nieznany, odczyt przyrostowy nie jest możliwy
+
+
+def read_dbf_watermark(dbf_file_path: str) -> DBFWatermark:
+    """
+    Odczytuje nagłówek oraz znaczniki usunięcia wszystkich rekordów (jeden bajt na rekord).
+    """
+    header = read_dbf_header(dbf_file_path)
+    with open(dbf_file_path, 'rb') as file:
+        file_stat = os.fstat(file.fileno())
+        if file_stat.st_size <= header.header_length:
+            deleted = np.zeros(0, dtype=bool)
+        else:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as file_map:
+                records = map_dbf_records(file_map, header)
+                deleted = records[:, 0] == DELETED_FLAG
+                del records
+    return DBFWatermark(record_count=len(deleted), record_length=header.record_length,
+                        last_update=header.last_update, deleted=deleted, modified_ns=file_stat.st_mtime_ns)
+
+
+def get_changed_record_numbers(previous: DBFWatermark, current: DBFWatermark) -> Optional[np.ndarray]:
+    """
+    Zwraca numery rekordów dopisanych od poprzedniego odczytu oraz rekordów ze zmienionym znacznikiem usunięcia.
+    Zwraca None, gdy odczyt przyrostowy nie jest możliwy: zmiana struktury lub ubytek rekordów (np. po PACK)
+    albo zmiana pliku (data w nagłówku, czas modyfikacji) bez dopisanych rekordów i zmienionych znaczników,
+    czyli edycja istniejących rekordów. Zwraca None także dla znacznika bez czasu modyfikacji pliku.
+    Edycja połączona z dopisaniem rekordów nie jest wykrywana.
+    """
+    if previous.modified_ns is None:
+        return None
+    if current.record_length != previous.record_length or current.record_count < previous.record_count:
+        return None
+    flipped = np.flatnonzero(current.deleted[:previous.record_count] != previous.deleted)
+    appended = np.arange(previous.record_count, current.record_count)
+    if len(flipped) == 0 and len(appended) == 0 and _file_changed(previous, current):
+        return None
+    return np.concatenate([flipped, appended])
+
+
+def _file_changed(previous: DBFWatermark, current: DBFWatermark) -> bool:
+    return current.last_update != previous.last_update or current.modified_ns != previous.modified_ns
+
+
+def convert_columns_to_string(df: DataFrame, column_list: list) -> DataFrame:
+    """
+    Zamienia podane kolumny na tekst, tak jak robi to read_csv z dtype=str w ścieżce ODBC.
+    """
+    for column in column_list:
+        if column in df.columns and df[column].dtype != object:
+            df[column] = df[column].astype(object).where(df[column].notna(), None).map(
+                lambda value: value if value is None else str(value))
+    return df
+
+
+def read_dbf_to_df(dbf_file_path: str, columns: Optional[List[str]] = None,
+                   filters: Optional[List[Tuple[str, str, Any]]] = None, encoding: Optional[str] = None,
+                   include_deleted: bool = tools.settings.DBF_INCLUDE_DELETED,
+                   record_numbers: Optional[np.ndarray] = None) -> DataFrame:
+    """
+    Odczytuje tabelę DBF do obiektu DataFrame z takimi samymi konwersjami typów jak parse_ODBC_to_df.
+    Indeksem ramki jest numer rekordu w pliku DBF. Przy podanej liście kolumn duplikaty nie są usuwane,
+    bo wiersze różniące się tylko pominiętymi kolumnami nie są duplikatami w pełnej tabeli.
+    """
+    if not os.path.isfile(dbf_file_path):
+        raise FileNotFoundError(f"Plik DBF nie został znaleziony: {dbf_file_path}")
+
+    data = read_dbf_columns(dbf_file_path, columns=columns, filters=filters, encoding=encoding,
+                            include_deleted=include_deleted, record_numbers=record_numbers)
+    record_numbers = data.pop('_recno')
+    df = DataFrame(_convert_empty_strings_to_none(data), index=pd.Index(record_numbers, name='recno'))
+    df = _convert_columns(df)
+    return df.drop_duplicates() if columns is None else df
+
+
+if __name__ == '__main__':
+    dbase_file_path_example = os.path.join(tools.settings.LOGIS_DIRECTORY, 'DANE', 'indexy_4.DBF')
+    header_example = read_dbf_header(dbase_file_path_example)
+    print(f"Wersja: {header_example.version:#x}, rekordów: {header_example.record_count}, "
+          f"ostatnia modyfikacja: {header_example.last_update}")
+    for field_example in header_example.fields:
+        print(field_example)
+
+    df_example = read_dbf_to_df(dbase_file_path_example)
+    print(df_example.head())
+    print(df_example.info())
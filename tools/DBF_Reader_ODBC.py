@@ -1,13 +1,20 @@
-from typing import Dict
+from typing import Dict, List, Tuple, Any
 from subprocess import CompletedProcess, run
+import json
+import struct
+import numpy as np
 import pandas as pd
 pd.set_option("display.max_columns", None)
 from pandas import DataFrame, read_csv
 from os.path import join, splitext, basename
 from os import remove
 import tools.settings
+import tools.columnar_format as columnar_format
+from tools.indeks_hierarchy import IndeksHierarchy
 import os
 
+FOXPRO_EMPTY_DATE = pd.Timestamp('1899-12-30')  # pusta data/czas zwracana przez sterownik VFP
+
 
 def construct_csv_path(dbase_file_path: str) -> str:
     """
@@ -17,6 +24,16 @@ def construct_csv_path(dbase_file_path: str) -> str:
     return join(tools.settings.CSV_FILES_PATH, csv_file_name)
 
 
+def construct_output_path(dbase_file_path: str, interchange_format: str) -> str:
+    """
+    Konstrukcja ścieżki do pliku wynikowego skryptu ODBC (CSV lub kolumnowego) na podstawie ścieżki do pliku DBF.
+    """
+    if interchange_format == 'csv':
+        return construct_csv_path(dbase_file_path)
+    output_file_name = splitext(basename(dbase_file_path))[0] + columnar_format.FILE_EXTENSION
+    return join(tools.settings.CSV_FILES_PATH, output_file_name)
+
+
 def is_file_locked(filepath: str) -> bool:
     """Sprawdza, czy plik jest zablokowany przez inny proces."""
     try:
@@ -25,11 +42,13 @@ def is_file_locked(filepath: str) -> bool:
     except IOError:
         return True
 
-def execute_odbc_script(dbase_file_path: str, python_interpreter_path: str, script_path: str) -> CompletedProcess:
+def execute_odbc_script(dbase_file_path: str, python_interpreter_path: str, script_path: str,
+                        interchange_format: str = tools.settings.ODBC_INTERCHANGE_FORMAT) -> CompletedProcess:
     """
     Wykonuje skrypt ODBC i zwraca wynik procesu.
     """
-    command_parameters = [python_interpreter_path, script_path, f'dbf_file_path={dbase_file_path}']
+    command_parameters = [python_interpreter_path, script_path, f'dbf_file_path={dbase_file_path}',
+                          f'output_format={interchange_format}']
     process = run(command_parameters, capture_output=True, text=True)
     if process.returncode != 0:
         print(f"Skrypt ODBC zwrócił błąd: {process.stderr}")
@@ -38,13 +57,112 @@ def execute_odbc_script(dbase_file_path: str, python_interpreter_path: str, scri
     return process
 
 
+def _read_buffer(view: memoryview, position: int) -> Tuple[memoryview, int]:
+    length = struct.unpack_from('<Q', view, position)[0]
+    start = position + 8
+    return view[start:start + length], start + length + (-length % 8)
+
+
+def _decode_columnar_batch(column_type: str, row_count: int, view: memoryview, position: int) -> Tuple[np.ndarray, int]:
+    """
+    Odczytuje jedną kolumnę jednej partii pliku kolumnowego. Bufory liczbowe są widokami bez kopiowania.
+    """
+    validity, position = _read_buffer(view, position)
+    is_valid = np.frombuffer(validity, dtype=np.uint8).astype(bool)
+    data, position = _read_buffer(view, position)
+
+    if column_type == 'str':
+        codes = np.frombuffer(data, dtype='<i4')
+        offsets_buffer, position = _read_buffer(view, position)
+        dictionary_data, position = _read_buffer(view, position)
+        offsets = np.frombuffer(offsets_buffer, dtype='<i4')
+        dictionary_bytes = bytes(dictionary_data)
+        dictionary = np.empty(len(offsets), dtype=object)
+        dictionary[:-1] = [dictionary_bytes[start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:])]
+        dictionary[-1] = None  # kod -1 oznacza brak wartości
+        return dictionary[codes], position
+
+    if column_type == 'int64':
+        values = np.frombuffer(data, dtype='<i8')
+        if not is_valid.all():
+            values = values.astype(np.float64)
+            values[~is_valid] = np.nan
+    elif column_type == 'float64':
+        values = np.frombuffer(data, dtype='<f8')
+    elif column_type == 'bool':
+        values = np.frombuffer(data, dtype=np.uint8).astype(bool)
+        if not is_valid.all():
+            values = values.astype(object)
+            values[~is_valid] = None
+    elif column_type == 'date':
+        values = np.frombuffer(data, dtype='<i4').astype('datetime64[D]')
+        values[~is_valid] = np.datetime64('NaT')
+    elif column_type == 'datetime':
+        values = np.frombuffer(data, dtype='<i8').view('datetime64[us]')
+        if not is_valid.all():
+            values = values.copy()
+            values[~is_valid] = np.datetime64('NaT')
+    else:
+        raise ValueError(f"Nieobsługiwany typ kolumny: {column_type}")
+    return values, position
+
+
+def read_columnar_to_df(file_path: str) -> DataFrame:
+    """
+    Wczytuje plik w formacie kolumnowym (tools.columnar_format) do obiektu DataFrame z zachowaniem typów.
+    """
+    with open(file_path, 'rb') as file:
+        view = memoryview(file.read())
+
+    magic_length = len(columnar_format.MAGIC)
+    if bytes(view[:magic_length]) != columnar_format.MAGIC:
+        raise ValueError(f"Plik '{file_path}' nie jest plikiem kolumnowym.")
+    version = struct.unpack_from('<H', view, magic_length)[0]
+    if version != columnar_format.FORMAT_VERSION:
+        raise ValueError(f"Nieobsługiwana wersja formatu kolumnowego: {version}")
+    position = magic_length + 2
+    schema_length = struct.unpack_from('<I', view, position)[0]
+    position += 4
+    columns = json.loads(bytes(view[position:position + schema_length]).decode('utf-8'))['columns']
+    position += schema_length
+
+    batches: Dict[str, List[np.ndarray]] = {column['name']: [] for column in columns}
+    while True:
+        row_count = struct.unpack_from('<I', view, position)[0]
+        position += 4
+        if row_count == 0:
+            break
+        for column in columns:
+            values, position = _decode_columnar_batch(column['type'], row_count, view, position)
+            batches[column['name']].append(values)
+
+    data = {}
+    for column in columns:
+        parts = batches[column['name']]
+        if not parts:
+            data[column['name']] = np.empty(0, dtype=object)
+        elif len(parts) == 1:
+            data[column['name']] = parts[0]
+        else:
+            # Kolumna całkowita z brakami tylko w części partii jest promowana do float
+            data[column['name']] = np.concatenate(parts)
+    df = DataFrame(data)
+    for column in columns:
+        if column['type'] == 'str':
+            # Puste teksty są w ścieżce CSV wczytywane jako brak wartości
+            df[column['name']] = df[column['name']].replace('', None)
+    return df
+
+
 def parse_ODBC_to_df(dbase_file_path: str, python_interpreter_path: str = tools.settings.PYTHON_32BIT_INTERPRETER,
                      script_path: str = tools.settings.ODBC_READ_SCRIPT_PATH,
-                     remove_csv_after_read: bool = True) -> DataFrame:
+                     remove_csv_after_read: bool = True,
+                     interchange_format: str = tools.settings.ODBC_INTERCHANGE_FORMAT) -> DataFrame:
     """
     Parsowanie danych z ODBC do obiektu DataFrame Pandas. Obsługuje błędy dostępu do plików.
+    Dane są przekazywane przez plik CSV lub plik kolumnowy z typami (interchange_format='columnar').
     """
-    csv_file_path = construct_csv_path(dbase_file_path)
+    csv_file_path = construct_output_path(dbase_file_path, interchange_format)
 
     # Sprawdzenie dostępności pliku DBF
     try:
@@ -59,7 +177,7 @@ def parse_ODBC_to_df(dbase_file_path: str, python_interpreter_path: str = tools.
             raise PermissionError(f"Plik DBF '{dbase_file_path}' jest niedostępny do odczytu.")
 
         # Wykonanie skryptu ODBC
-        result = execute_odbc_script(dbase_file_path, python_interpreter_path, script_path)
+        result = execute_odbc_script(dbase_file_path, python_interpreter_path, script_path, interchange_format)
         if result.returncode != 0:
             print(f"Skrypt ODBC nie powiódł się: {result.stderr}")
             raise RuntimeError(f"Skrypt ODBC zakończył się kodem {result.returncode}")
@@ -77,8 +195,11 @@ def parse_ODBC_to_df(dbase_file_path: str, python_interpreter_path: str = tools.
         if not os.path.isfile(csv_file_path):
             raise FileNotFoundError(f"Plik CSV nie został znaleziony: {csv_file_path}. Skrypt ODBC mógł nie wygenerować pliku CSV.")
 
-        dtype: Dict[str, str] = {col: str for col in tools.settings.STRING_COLUMN_LIST}
-        df = read_csv(csv_file_path, dtype=dtype, low_memory=False)
+        if interchange_format == 'csv':
+            dtype: Dict[str, str] = {col: str for col in tools.settings.STRING_COLUMN_LIST}
+            df = read_csv(csv_file_path, dtype=dtype, low_memory=False)
+        else:
+            df = read_columnar_to_df(csv_file_path)
 
     except FileNotFoundError as fnf_error:
         print(f"Plik CSV nie został znaleziony: {csv_file_path}. Skrypt ODBC mógł nie wygenerować pliku CSV.")
@@ -119,32 +240,54 @@ def convert_columns_to_numeric(df: DataFrame, column_list: list) -> DataFrame:
     return df
 
 
-def convert_columns_to_date(df: DataFrame, date_columns_list: list, datetime_column_list: list) -> DataFrame:
+def get_filter_mask(df: DataFrame, filters: List[Tuple[str, str, Any]]):
     """
-    Konwertuje podane kolumny w DataFrame na typy daty i czasu.
-    Obsługuje nieprawidłowe formaty i przekroczenia zakresu dat.
+    Zwraca maskę wierszy spełniających wszystkie warunki (kolumna, operator, wartość).
+    Obsługiwane operatory: '==', '!=', 'in', 'isnull', 'notnull'.
     """
-    for column in df.columns:
-        if column in date_columns_list:
-            try:
-                df[column] = pd.to_datetime(df[column], format='%Y-%m-%d', errors='coerce').dt.date
-            except ValueError as ve:
-                print(f"Nie udało się przekonwertować kolumny {column} na typ daty: {ve}")
+    mask = pd.Series(True, index=df.index)
+    for column, operator, value in filters:
+        if operator == '==':
+            mask &= df[column] == value
+        elif operator == '!=':
+            mask &= df[column] != value
+        elif operator == 'in':
+            mask &= df[column].isin(value)
+        elif operator == 'isnull':
+            mask &= df[column].isnull()
+        elif operator == 'notnull':
+            mask &= df[column].notnull()
+        else:
+            raise ValueError(f"Nieobsługiwany operator warunku: {operator}")
+    return mask.to_numpy()
+
+
+def _normalize_date_column(values: pd.Series, date_format: str = None) -> pd.Series:
+    """
+    Konwertuje kolumnę na datetime64 (jeśli nie jest już tego typu) i zamienia pustą datę FoxPro na NaT.
+    """
+    if not pd.api.types.is_datetime64_any_dtype(values):
+        values = pd.to_datetime(values, format=date_format, errors='coerce')
+    return values.mask(values == FOXPRO_EMPTY_DATE)
 
-        elif column in datetime_column_list:
-            try:
-                df[column] = pd.to_datetime(df[column], errors='coerce')
-            except ValueError as ve:
-                print(f"Nie udało się przekonwertować kolumny {column} na typ daty/czasu: {ve}")
 
-        # Zamiana NaT na None
-        df[column] = df[column].where(pd.notnull(df[column]), None)
+def convert_columns_to_date(df: DataFrame, date_columns_list: list, datetime_column_list: list) -> DataFrame:
+    """
+    Konwertuje podane kolumny w DataFrame na typ datetime64, pozostałe kolumny pozostają bez zmian.
+    Nieprawidłowe wartości i pusta data FoxPro (1899-12-30) stają się NaT. Kolumny dat są obcinane do dnia,
+    ale zachowują typ datetime64, więc dalsze obliczenia na datach pozostają wektorowe.
+    """
+    for column in df.columns.intersection(date_columns_list):
+        try:
+            df[column] = _normalize_date_column(df[column], '%Y-%m-%d').dt.normalize()
+        except ValueError as ve:
+            print(f"Nie udało się przekonwertować kolumny {column} na typ daty: {ve}")
 
-        # Zamiana konkretnej wartości '1899-12-30' na None
-        if column in datetime_column_list:
-            df[column] = df[column].apply(lambda x: None if x == pd.Timestamp('1899-12-30 00:00:00') else x)
-        elif column in date_columns_list:
-            df[column] = df[column].apply(lambda x: None if x == pd.Timestamp('1899-12-30').date() else x)
+    for column in df.columns.intersection(datetime_column_list).difference(date_columns_list):
+        try:
+            df[column] = _normalize_date_column(df[column])
+        except ValueError as ve:
+            print(f"Nie udało się przekonwertować kolumny {column} na typ daty/czasu: {ve}")
 
     return df
 
@@ -159,21 +302,14 @@ if __name__ == '__main__':
         print(df_example.info())
         print(df_example.describe())
 
-        # Remove spaces and calculate the length of 'indeks' strings
-        df_example['indeks_length'] = df_example['indeks'].str.replace(" ", "").str.len()
-
-        # Count rows with specific lengths: 2, 4, 6, 8, and 11
-        count_2_char_rows = df_example[df_example['indeks_length'] == 2].shape[0]
-        count_4_char_rows = df_example[df_example['indeks_length'] == 4].shape[0]
-        count_6_char_rows = df_example[df_example['indeks_length'] == 6].shape[0]
-        count_8_char_rows = df_example[df_example['indeks_length'] == 8].shape[0]
-        count_11_char_rows = df_example[df_example['indeks_length'] == 11].shape[0]
-
-        print(f"Liczba dziedzin: {count_2_char_rows}")
-        print(f"Liczba grup: {count_4_char_rows}")
-        print(f"Liczba podgrup: {count_6_char_rows}")
-        print(f"Liczba nazw: {count_8_char_rows}")
-        print(f"Liczba typów: {count_11_char_rows}")
+        # Count codes on every level of the index: 2, 4, 6, 8, and 11 characters
+        level_counts = IndeksHierarchy(df_example).level_counts()
+
+        print(f"Liczba dziedzin: {level_counts[2]}")
+        print(f"Liczba grup: {level_counts[4]}")
+        print(f"Liczba podgrup: {level_counts[6]}")
+        print(f"Liczba nazw: {level_counts[8]}")
+        print(f"Liczba typów: {level_counts[11]}")
 
     except Exception as e:
         print("Główna część programu nie powiodła się:", e)
@@ -5,47 +5,355 @@ from tools.DBF_Reader_ODBC import parse_ODBC_to_df
 from tools.settings import DBF_PATHS, PYTHON_32BIT_INTERPRETER, ODBC_READ_SCRIPT_PATH, DATE_COLUMN_LIST
 
 pd.set_option("display.max_columns", None)
-from typing import Dict
+from typing import Dict, List, Tuple, Any, Optional, NamedTuple, Iterable, Union
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+import time
+import numpy as np
 import pandas as pd
 pd.set_option("display.max_rows", None)
 from pandas import DataFrame
-from DBF_Reader_ODBC import parse_ODBC_to_df
-from settings import DBF_PATHS, PYTHON_32BIT_INTERPRETER, ODBC_READ_SCRIPT_PATH, DATE_COLUMN_LIST, DATETIME_COLUMN_LIST
+from DBF_Reader_ODBC import parse_ODBC_to_df, get_filter_mask
+from DBF_Reader_Native import read_dbf_to_df, read_dbf_header, read_dbf_watermark, get_changed_record_numbers, DBFWatermark
+from table_cache import TableCache, SourceFingerprint
+from category_registry import CategoryRegistry
+from settings import DBF_PATHS, PYTHON_32BIT_INTERPRETER, ODBC_READ_SCRIPT_PATH, DATE_COLUMN_LIST, DATETIME_COLUMN_LIST, \
+    DATA_LOADER_BACKEND, USE_TABLE_CACHE, TABLE_CACHE_PATH, DELTA_REFRESH_TABLES, DATA_LOADER_MAX_WORKERS, \
+    USE_CATEGORICAL_COLUMNS, CATEGORICAL_COLUMN_LIST
 
 pd.set_option("display.max_columns", None)
 
 
+class TableQuery(NamedTuple):
+    """
+    Column projection and row filters for a single table. Filters are (column, operator, value) tuples,
+    see get_filter_mask for the supported operators.
+    """
+    key: str
+    columns: Optional[Tuple[str, ...]] = None
+    filters: Tuple[Tuple[str, str, Any], ...] = ()
+
+
 class DataLoader:
     """
-    Class DataLoader automates the loading and updating of data from an ODBC datasource.
+    Class DataLoader automates the loading and updating of data from an ODBC datasource or directly from DBF files.
     The class uses the keys defined in the DBF_PATHS to identify the data to be loaded.
     """
 
-    def __init__(self, remove_csv_after_read=True):
+    BACKENDS = ('odbc', 'native')
+
+    def __init__(self, remove_csv_after_read=True, backend=DATA_LOADER_BACKEND, use_cache=USE_TABLE_CACHE,
+                 cache_dir=TABLE_CACHE_PATH, delta_tables=DELTA_REFRESH_TABLES, compact=USE_CATEGORICAL_COLUMNS):
         """
         Constructor for the DataLoader class.
 
         Params:
         remove_csv_after_read: boolean, if true the csv file will be deleted after data extraction.
+        backend: str, 'odbc' runs the 32-bit ODBC extraction script, 'native' reads the DBF/FPT files in-process.
+        use_cache: boolean, if true whole tables are cached on disk and reused until the source DBF file changes.
+        cache_dir: str, the directory of the on-disk table cache.
+        delta_tables: list of keys refreshed incrementally (native backend only), see _apply_delta.
+        compact: boolean, if true the columns from CATEGORICAL_COLUMN_LIST are loaded as categoricals
+                 with categories shared across all tables of this loader.
         """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown DataLoader backend '{backend}', expected one of {self.BACKENDS}")
         self.remove_csv_after_read = remove_csv_after_read
+        self.backend = backend
+        self.cache = TableCache(cache_dir, backend) if use_cache else None
         self._loaded_data: Dict[str, DataFrame] = {}
+        self._loaded_queries: Dict[TableQuery, DataFrame] = {}
+        self._fingerprints: Dict[str, Optional[SourceFingerprint]] = {}
+        self.delta_tables = set(delta_tables)
+        self._watermarks: Dict[str, DBFWatermark] = {}
+        self.categories = CategoryRegistry(CATEGORICAL_COLUMN_LIST) if compact else None
+        self._load_locks: Dict[Union[str, TableQuery], Lock] = {}
+        self._load_locks_guard = Lock()
         self._generate_properties()
 
-    def _load_data_if_not_loaded(self, key: str) -> DataFrame:
+    def _load_lock(self, request: Union[str, TableQuery]) -> Lock:
+        """
+        Returns the lock of a table key or a query, so that concurrent loads (prefetch) fetch each of them only once.
+        """
+        with self._load_locks_guard:
+            return self._load_locks.setdefault(request, Lock())
+
+    def _load_data_if_not_loaded(self, key: str, compact: bool = True) -> DataFrame:
         """
         Ensures data is loaded for a specific key if it isn't already loaded.
 
         Params:
         key: str, the key for the data to be loaded.
+        compact: boolean, if false the categorical columns are not encoded; prefetch encodes them
+                 in the calling thread after all tables are loaded.
 
         Returns:
         Loaded DataFrame corresponding to the key.
         """
         if key not in self._loaded_data:
-            self._loaded_data[key] = self._fetch_data(key)
+            with self._load_lock(key):
+                if key not in self._loaded_data:
+                    df = self._fetch_data_cached(key)
+                    self._loaded_data[key] = self._compact(df) if compact else df
         return self._loaded_data[key]
 
+    def _compact(self, df: DataFrame) -> DataFrame:
+        """
+        In compact mode encodes the categorical columns of a newly loaded table and extends the categories
+        of the tables loaded before, so all of them share the same categories.
+        """
+        if self.categories is None:
+            return df
+        self.categories.encode(df)
+        self.align_categories()
+        return df
+
+    def align_categories(self):
+        """
+        Extends the categories of all loaded tables to the current shared dictionaries (compact mode only).
+        DataFrames derived from the loaded tables before the call keep their categories; merges between them
+        and the aligned tables are still correct, but compare values instead of codes.
+        """
+        if self.categories is None:
+            return
+        for df in list(self._loaded_data.values()) + list(self._loaded_queries.values()):
+            self.categories.align(df)
+
+    def _source_fingerprint(self, key: str) -> Optional[SourceFingerprint]:
+        """
+        Returns the fingerprint of the source DBF file, or None if it cannot be read (the fetch reports the error).
+        """
+        try:
+            return SourceFingerprint.of(DBF_PATHS[key])
+        except (OSError, ValueError):
+            return None
+
+    def _is_source_unchanged(self, key: str) -> bool:
+        """
+        Checks whether the source DBF file is still in the state the loaded data was read from.
+        """
+        fingerprint = self._fingerprints.get(key)
+        return fingerprint is not None and fingerprint == self._source_fingerprint(key)
+
+    def _supports_delta(self, key: str) -> bool:
+        """
+        Checks whether the table can be refreshed incrementally.
+        """
+        return self.backend == 'native' and key in self.delta_tables
+
+    def _fetch_data_cached(self, key: str) -> DataFrame:
+        """
+        Retrieves data for a given key from the on-disk cache if the source DBF file did not change.
+        Otherwise, for tables in delta_tables, only the appended and re-flagged records are read and merged
+        into the previous version of the table (kept in memory or in the cache); other tables are fetched
+        through the backend. The result is stored in the cache.
+
+        Params:
+        key: str, the key to fetch data for.
+
+        Returns:
+        DataFrame that contains data based on the key.
+        """
+        fingerprint = self._source_fingerprint(key) if self.cache is not None else None
+        if fingerprint is not None:
+            df = self.cache.load(key, fingerprint)
+            if df is not None:
+                print(f"Loaded {key} from cache ({len(df)} rows, source unchanged).")
+                self._fingerprints[key] = fingerprint
+                if self._supports_delta(key):
+                    self._store_watermark(key, self.cache.load_watermark(key))
+                return df
+
+        df = None
+        if self._supports_delta(key):
+            base, watermark = self._loaded_data.get(key), self._watermarks.get(key)
+            if (base is None or watermark is None) and self.cache is not None:
+                base, watermark = self.cache.load_stale(key), self.cache.load_watermark(key)
+            if base is not None and watermark is not None:
+                df = self._apply_delta(key, base, watermark)
+        if df is None:
+            df = self._fetch_data(key)
+        self._fingerprints[key] = fingerprint
+        if fingerprint is not None:
+            try:
+                self.cache.store(key, fingerprint, df, watermark=self._watermarks.get(key))
+            except Exception as e:
+                print(f"Cannot store {key} in cache: {e}")
+        return df
+
+    def _store_watermark(self, key: str, watermark: Optional[DBFWatermark]):
+        if watermark is None:
+            self._watermarks.pop(key, None)
+        else:
+            self._watermarks[key] = watermark
+
+    def _apply_delta(self, key: str, df: DataFrame, watermark: DBFWatermark) -> Optional[DataFrame]:
+        """
+        Merges the records appended to the DBF file and the records whose deleted flag changed since the watermark
+        was taken into the given table. The table is indexed by the record number, so the changed records
+        replace their previous versions and the appended ones are added at the end.
+        The tables in delta_tables must be append-only: a file changed without appended records or changed deleted
+        flags (an in-place edit) is read in full, but in-place edits made together with appends are not detected.
+
+        Params:
+        key: str, the key of the table.
+        df: DataFrame, the table read when the watermark was taken.
+        watermark: DBFWatermark, the state of the source DBF file the table corresponds to.
+
+        Returns:
+        Updated DataFrame, or None if the file was restructured, packed or edited in place and has to be read in full.
+        """
+        if watermark.modified_ns is None:
+            print(f"The watermark of {key} has no file modification time, reading the whole table.")
+            return None
+        try:
+            current = read_dbf_watermark(DBF_PATHS[key])
+        except (OSError, ValueError) as e:
+            print(f"Cannot read the watermark of {key}: {e}")
+            return None
+        changed_record_numbers = get_changed_record_numbers(watermark, current)
+        if changed_record_numbers is None:
+            print(f"Warning: {key} was restructured, packed or edited in place, so it is not append-only; "
+                  f"reading the whole table.")
+            return None
+        self._watermarks[key] = current
+        if len(changed_record_numbers) == 0:
+            print(f"No new or changed records in {key}.")
+            return df
+
+        print(f"Reading {len(changed_record_numbers)} new or changed records of {key} "
+              f"({watermark.record_count} -> {current.record_count} records)...")
+        delta_df = self._format_date_columns(read_dbf_to_df(DBF_PATHS[key], record_numbers=changed_record_numbers))
+        df = df.drop(index=changed_record_numbers, errors='ignore')
+        return pd.concat([df, delta_df]).sort_index()
+
+    def load(self, key: str, columns: Optional[List[str]] = None,
+             filters: Optional[List[Tuple[str, str, Any]]] = None) -> DataFrame:
+        """
+        Loads only the requested columns of the rows matching all filters.
+        With the native backend the filters are evaluated while scanning the DBF file, so only the matching
+        records and requested fields are decoded. With the ODBC backend the whole table is loaded and filtered.
+
+        Params:
+        key: str, the key of the table in DBF_PATHS.
+        columns: list of column names to return, all columns if None.
+        filters: list of (column, operator, value) tuples, e.g. [('pr_id', '==', INDEX_PRACOWNI), ('k_do_datap', 'isnull', None)].
+
+        Returns:
+        DataFrame with the selected columns and rows.
+        """
+        query = TableQuery(key, tuple(columns) if columns is not None else None,
+                           tuple((column, operator, tuple(value) if isinstance(value, list) else value)
+                                 for column, operator, value in filters or []))
+        return self._load_query(query)
+
+    def _load_query(self, query: TableQuery, compact: bool = True) -> DataFrame:
+        """
+        Returns the result of the query, fetching it once (see _load_data_if_not_loaded for compact).
+        """
+        if query.columns is None and not query.filters:
+            return self._load_data_if_not_loaded(query.key, compact)
+        if query not in self._loaded_queries:
+            with self._load_lock(query):
+                if query not in self._loaded_queries:
+                    df = self._fetch_query(query, compact)
+                    self._loaded_queries[query] = self._compact(df) if compact else df
+        return self._loaded_queries[query]
+
+    def table_columns(self, key: str) -> List[str]:
+        """
+        Returns the column names of a table. With the native backend they are read from the DBF header,
+        with the ODBC backend the table has to be loaded.
+
+        Params:
+        key: str, the key of the table in DBF_PATHS.
+
+        Returns:
+        List of column names.
+        """
+        if key in self._loaded_data:
+            return list(self._loaded_data[key].columns)
+        if self.backend == 'native':
+            return [field.name for field in read_dbf_header(DBF_PATHS[key]).fields]
+        return list(self._load_data_if_not_loaded(key).columns)
+
+    def prefetch(self, tables: Iterable[Union[str, TableQuery]],
+                 max_workers: Optional[int] = DATA_LOADER_MAX_WORKERS) -> Dict[str, float]:
+        """
+        Loads several tables concurrently, so the startup takes about as long as the slowest table instead of
+        the sum of all of them. Every extraction runs in its own process (ODBC backend) or mostly in NumPy and I/O
+        (native backend), so a bounded thread pool is enough. Tables already loaded are returned immediately.
+        Every table and query is fetched once, even if several requests need it. In compact mode the categorical
+        columns are encoded in the calling thread after all loads finished, not in the worker threads.
+
+        Params:
+        tables: keys of DBF_PATHS for whole tables or TableQuery objects for projected and filtered ones.
+        max_workers: int, the maximum number of tables loaded at the same time, None for the executor default.
+
+        Returns:
+        Dictionary with the load time in seconds of every table (or query).
+        """
+        requests = list(dict.fromkeys(tables))
+        for request in requests:
+            key = request.key if isinstance(request, TableQuery) else request
+            if key not in DBF_PATHS:
+                raise KeyError(f"Unknown table '{key}', expected one of the keys of DBF_PATHS")
+
+        def load_timed(request: Union[str, TableQuery]) -> float:
+            start = time.perf_counter()
+            if isinstance(request, TableQuery):
+                self._load_query(request, compact=False)
+            else:
+                self._load_data_if_not_loaded(request, compact=False)
+            return time.perf_counter() - start
+
+        loaded_before = set(self._loaded_data) | set(self._loaded_queries)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='DataLoader') as executor:
+            futures = {request: executor.submit(load_timed, request) for request in requests}
+            timings = {(f"{request.key} (query)" if isinstance(request, TableQuery) else request): future.result()
+                       for request, future in futures.items()}
+        if self.categories is not None:
+            for request, df in list(self._loaded_data.items()) + list(self._loaded_queries.items()):
+                if request not in loaded_before:
+                    self.categories.encode(df)
+        self.align_categories()
+        for label, seconds in timings.items():
+            print(f"Loaded {label} in {seconds:.2f} s")
+        print(f"Prefetched {len(timings)} tables in {time.perf_counter() - start:.2f} s "
+              f"(sequential sum {sum(timings.values()):.2f} s)")
+        return timings
+
+    def _fetch_query(self, query: TableQuery, compact: bool = True) -> DataFrame:
+        """
+        Retrieves the projected and filtered data described by the query.
+
+        Params:
+        query: TableQuery, the table, columns and filters to fetch.
+        compact: boolean, passed to _load_data_if_not_loaded when the whole table has to be loaded.
+
+        Returns:
+        DataFrame that contains the selected columns of the matching rows.
+        """
+        columns = list(query.columns) if query.columns is not None else None
+        filters = list(query.filters)
+        if self.backend == 'native' and query.key not in self._loaded_data:
+            print(f"Fetching {query.key} from {DBF_PATHS[query.key]} using native backend "
+                  f"(columns={columns}, filters={filters})...")
+            if self.cache is not None:
+                self._fingerprints[query.key] = self._source_fingerprint(query.key)
+            try:
+                df = read_dbf_to_df(DBF_PATHS[query.key], columns=columns, filters=filters)
+                return self._format_date_columns(df)
+            except FileNotFoundError:
+                raise FileNotFoundError(f"Cannot find the specified file: {DBF_PATHS[query.key]}")
+            except Exception as e:
+                raise RuntimeError(f"Error occurred while fetching data for {query.key}: {str(e)}")
+
+        df = self._load_data_if_not_loaded(query.key, compact)
+        df = df[get_filter_mask(df, filters)]
+        return df[columns].copy() if columns is not None else df.copy()
+
     def _generate_properties(self):
         """
         Creates properties for each key in DBF_PATHS.
@@ -73,7 +381,7 @@ class DataLoader:
 
     def _fetch_data(self, key: str) -> DataFrame:
         """
-        Retrieves data for a given key through ODBC.
+        Retrieves data for a given key through ODBC or the native DBF reader, depending on the backend.
 
         Params:
         key: str, the key to fetch data for.
@@ -85,14 +393,21 @@ class DataLoader:
         FileNotFoundError if the specified file cannot be found.
         RuntimeError if an error occurred while fetching data.
         """
-        print(f"Fetching {key} from {DBF_PATHS[key]} using ODBC...")
+        print(f"Fetching {key} from {DBF_PATHS[key]} using {self.backend} backend...")
         try:
-            df = parse_ODBC_to_df(
-                dbase_file_path=DBF_PATHS[key],
-                python_interpreter_path=PYTHON_32BIT_INTERPRETER,
-                script_path=ODBC_READ_SCRIPT_PATH,
-                remove_csv_after_read=self.remove_csv_after_read
-            )
+            if self._supports_delta(key):
+                watermark = read_dbf_watermark(DBF_PATHS[key])
+                df = read_dbf_to_df(DBF_PATHS[key], record_numbers=np.arange(watermark.record_count))
+                self._watermarks[key] = watermark
+            elif self.backend == 'native':
+                df = read_dbf_to_df(DBF_PATHS[key])
+            else:
+                df = parse_ODBC_to_df(
+                    dbase_file_path=DBF_PATHS[key],
+                    python_interpreter_path=PYTHON_32BIT_INTERPRETER,
+                    script_path=ODBC_READ_SCRIPT_PATH,
+                    remove_csv_after_read=self.remove_csv_after_read
+                )
             return self._format_date_columns(df)
         except FileNotFoundError:
             raise FileNotFoundError(f"Cannot find the specified file: {DBF_PATHS[key]}")
@@ -101,11 +416,23 @@ class DataLoader:
 
     def refresh_data(self):
         """
-        Updates all currently loaded data through the ODBC datasource.
+        Updates all currently loaded data through the configured backend.
+        With the cache enabled, tables whose source DBF file did not change are kept as they are.
+        Tables in delta_tables read with the native backend are refreshed incrementally.
         """
+        unchanged_keys = {key for key in set(self._loaded_data) | {query.key for query in self._loaded_queries}
+                          if self.cache is not None and self._is_source_unchanged(key)}
         for key in self._loaded_data:
-            print(f"Refreshing {key} from {DBF_PATHS[key]} using ODBC...")
-            self._loaded_data[key] = self._fetch_data(key)
+            if key in unchanged_keys:
+                print(f"Skipping refresh of {key}, source unchanged.")
+                continue
+            print(f"Refreshing {key} from {DBF_PATHS[key]} using {self.backend} backend...")
+            self._loaded_data[key] = self._compact(self._fetch_data_cached(key))
+        for query in self._loaded_queries:
+            if query.key in unchanged_keys:
+                continue
+            print(f"Refreshing {query.key} (columns={query.columns}, filters={query.filters})...")
+            self._loaded_queries[query] = self._compact(self._fetch_query(query))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,71 @@
+"""
+Porównanie wariantów kary za przekroczenie limitu techników (CAPACITY_PENALTY_SHAPE, CAPACITY_PENALTY_LEVEL)
+na zarchiwizowanym problemie (migawka z load_problem(use_archive_data=True)).
+Dla każdego wariantu podaje czas dojścia do rozwiązania dopuszczalnego (hard = 0) oraz końcowy przydział.
+Wariant 'count'/'hard' to dotychczasowa kara ONE_HARD za każdego przeciążonego technika.
+
+Uruchomienie z katalogu tools: python benchmark_capacity.py --seconds 300 --seed 0
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import pandas as pd
+
+VARIANTS = [('count', 'hard'), ('linear', 'hard'), ('squared', 'hard'), ('linear', 'medium')]
+
+
+def run_variant(shape: str, level: str, spent_seconds: int, seed: int) -> dict:
+    """
+    Rozwiązuje problem z danym wariantem kary. Wywoływana w nowym procesie, bo typ wyniku i ograniczenia
+    są ustalane przy imporcie domain i constraints na podstawie settings.
+    """
+    import settings
+    settings.CAPACITY_PENALTY_SHAPE, settings.CAPACITY_PENALTY_LEVEL = shape, level
+    from dataclasses import replace
+    from timefold.solver import SolverFactory
+    from timefold.solver.config import TerminationConfig, Duration
+    from domain import DeviceSchedule, load_problem
+    from solver_config import create_solver_config
+    from termination import ScoreTimeline, format_score
+
+    technicians_list, devices_list = load_problem(use_archive_data=True)
+    solver_config = replace(create_solver_config(TerminationConfig(spent_limit=Duration(seconds=spent_seconds))),
+                            random_seed=seed)
+    solver = SolverFactory.create(solver_config).build_solver()
+    timeline = ScoreTimeline()
+    solver.add_event_listener(lambda event: timeline.record(event.new_best_solution.score))
+    solution = solver.solve(DeviceSchedule("benchmark", technicians_list, devices_list))
+
+    loads = {}
+    for device in solution.device_list:
+        if device.technician is not None:
+            loads[device.technician.id] = loads.get(device.technician.id, 0) + device.rbh_norma
+    capacities = {technician.id: technician.rbh_do_zaplanowania for technician in solution.technician_list}
+    return {
+        'variant': f"{shape}/{level}",
+        'time_to_feasible_s': next((point[0] for point in timeline.points if point[1] >= 0), None),
+        'final_score': format_score(timeline.final_score()) if timeline.points else None,
+        'overloaded_technicians': sum(1 for technician_id, load in loads.items() if load > capacities[technician_id]),
+        'overload_minutes': sum(max(load - capacities[technician_id], 0) for technician_id, load in loads.items()),
+        'assigned_devices': sum(1 for device in solution.device_list if device.technician is not None),
+    }
+
+
+def run_benchmark(spent_seconds: int, seed: int) -> pd.DataFrame:
+    """
+    Uruchamia kolejno wszystkie warianty, każdy w osobnym procesie, aby nie konkurowały o rdzenie.
+    """
+    results = []
+    for shape, level in VARIANTS:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+            results.append(executor.submit(run_variant, shape, level, spent_seconds, seed).result())
+        print(f"Finished {shape}/{level}: {results[-1]}")
+    return pd.DataFrame(results)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time to a feasible solution for the capacity penalty variants.")
+    parser.add_argument('--seconds', type=int, default=300, help="time limit of every variant")
+    parser.add_argument('--seed', type=int, default=0, help="random seed of the solver")
+    args = parser.parse_args()
+    print(run_benchmark(args.seconds, args.seed).to_string(index=False))
@@ -0,0 +1,77 @@
+from typing import Dict, Iterable
+from threading import Lock
+import pandas as pd
+from pandas import DataFrame
+
+
+class CategoryRegistry:
+    """
+    Class CategoryRegistry keeps one append-only dictionary of values per column name, shared by all tables.
+    Columns encoded through the registry are pandas categoricals with identical categories in every table,
+    so merges and groupby operations on them compare integer codes instead of Python strings.
+    """
+
+    def __init__(self, columns: Iterable[str]):
+        """
+        Constructor for the CategoryRegistry class.
+
+        Params:
+        columns: names of the columns stored as categoricals.
+        """
+        self.columns = list(columns)
+        self._categories: Dict[str, pd.Index] = {}
+        self._lock = Lock()
+
+    def _extend(self, column: str, values: pd.Index) -> pd.Index:
+        """
+        Appends the values missing in the dictionary of the column and returns the whole dictionary.
+        The existing values keep their positions, so codes of already encoded columns stay valid.
+        """
+        categories = self._categories.get(column, pd.Index([], dtype=object))
+        new_values = values.difference(categories, sort=False)
+        if len(new_values):
+            categories = categories.append(pd.Index(new_values, dtype=object))
+            self._categories[column] = categories
+        return categories
+
+    def encode(self, df: DataFrame) -> DataFrame:
+        """
+        Converts the registered columns of the DataFrame to categoricals with the shared categories.
+
+        Params:
+        df: DataFrame, the table to encode; it is modified in place.
+
+        Returns:
+        The same DataFrame with categorical columns.
+        """
+        with self._lock:
+            for column in df.columns.intersection(self.columns):
+                series = df[column]
+                if isinstance(series.dtype, pd.CategoricalDtype):
+                    categories = self._extend(column, pd.Index(series.cat.categories, dtype=object))
+                    df[column] = series.cat.set_categories(categories)
+                else:
+                    categories = self._extend(column, pd.Index(series.dropna().unique(), dtype=object))
+                    df[column] = pd.Categorical(series, categories=categories)
+        return df
+
+    def align(self, df: DataFrame) -> DataFrame:
+        """
+        Adds the categories registered since the DataFrame was encoded, so it matches the tables loaded later.
+        Only the categories are extended, the codes are not recomputed.
+
+        Params:
+        df: DataFrame, a table encoded earlier; it is modified in place.
+
+        Returns:
+        The same DataFrame.
+        """
+        with self._lock:
+            for column in df.columns.intersection(self.columns):
+                series = df[column]
+                categories = self._categories.get(column)
+                if (categories is None or not isinstance(series.dtype, pd.CategoricalDtype)
+                        or len(series.cat.categories) == len(categories)):
+                    continue
+                df[column] = series.cat.add_categories(categories[len(series.cat.categories):])
+        return df
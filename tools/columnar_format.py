@@ -0,0 +1,137 @@
+"""
+Typed columnar interchange format used between the 32-bit ODBC extraction script and the 64-bit loader.
+
+pyarrow is not available for 32-bit Python on Windows, so this module implements a small self-describing
+format with the standard library only. The 64-bit side reads the numeric buffers with numpy.frombuffer
+without parsing text, and dates, numbers and strings keep their types end to end.
+
+File layout (all integers little-endian):
+
+    MAGIC (6 bytes) | FORMAT_VERSION (uint16)
+    schema length (uint32) | schema JSON: {"columns": [{"name": ..., "type": ...}, ...]}
+    batches: row count (uint32, 0 marks the end of the file), then for every column its buffers
+
+Every buffer is stored as its byte length (uint64) followed by the data padded to 8 bytes.
+Every column starts with a validity buffer (one byte per row, 1 = value present) followed by:
+
+    int64, float64 : 8 bytes per row
+    bool           : 1 byte per row
+    date           : int32 days since 1970-01-01
+    datetime       : int64 microseconds since 1970-01-01
+    str            : int32 dictionary codes per row, int32 dictionary offsets, UTF-8 dictionary data
+"""
+from typing import BinaryIO, Dict, List, Sequence
+from array import array
+from datetime import date, datetime
+from decimal import Decimal
+import json
+import struct
+import sys
+
+MAGIC = b'TFCOL\x00'
+FORMAT_VERSION = 1
+FILE_EXTENSION = '.tfcol'
+COLUMN_TYPES = ('int64', 'float64', 'bool', 'date', 'datetime', 'str')
+EPOCH_DATE = date(1970, 1, 1)
+EPOCH_DATETIME = datetime(1970, 1, 1)
+MAX_INT64_PRECISION = 18
+
+
+def column_type_from_description(description: Sequence, string_columns: Sequence[str] = ()) -> str:
+    """
+    Map a DB-API cursor description entry (name, type_code, display_size, internal_size, precision, scale, null_ok)
+    to a column type. Columns listed in string_columns are always stored as text, like dtype=str in read_csv.
+    """
+    name, type_code = description[0], description[1]
+    precision, scale = description[4], description[5]
+    if name in string_columns:
+        return 'str'
+    if type_code is bool:
+        return 'bool'
+    if type_code is int:
+        return 'int64'
+    if type_code is Decimal:
+        return 'int64' if scale == 0 and precision is not None and precision <= MAX_INT64_PRECISION else 'float64'
+    if type_code is float:
+        return 'float64'
+    if type_code is datetime:
+        return 'datetime'
+    if type_code is date:
+        return 'date'
+    return 'str'
+
+
+def _to_little_endian(values: array) -> bytes:
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values.tobytes()
+
+
+def _write_buffer(file: BinaryIO, data: bytes):
+    file.write(struct.pack('<Q', len(data)))
+    file.write(data)
+    file.write(b'\x00' * (-len(data) % 8))
+
+
+def _encode_values(column_type: str, values: list) -> List[bytes]:
+    """
+    Encode one column of a batch (None means a missing value) into its data buffers.
+    """
+    if column_type == 'int64':
+        return [_to_little_endian(array('q', (0 if value is None else int(value) for value in values)))]
+    if column_type == 'float64':
+        return [_to_little_endian(array('d', (float('nan') if value is None else float(value) for value in values)))]
+    if column_type == 'bool':
+        return [bytes(0 if value is None else int(bool(value)) for value in values)]
+    if column_type == 'date':
+        return [_to_little_endian(array('i', (0 if value is None else (value - EPOCH_DATE).days for value in values)))]
+    if column_type == 'datetime':
+        deltas = (None if value is None else value - EPOCH_DATETIME for value in values)
+        return [_to_little_endian(array('q', (0 if delta is None else
+                                              (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+                                              for delta in deltas)))]
+
+    dictionary: Dict[str, int] = {}
+    codes = array('i')
+    for value in values:
+        if value is None:
+            codes.append(-1)
+            continue
+        text = value.strip() if isinstance(value, str) else str(value)
+        codes.append(dictionary.setdefault(text, len(dictionary)))
+    offsets = array('i', [0])
+    data = bytearray()
+    for text in dictionary:
+        data += text.encode('utf-8')
+        offsets.append(len(data))
+    return [_to_little_endian(codes), _to_little_endian(offsets), bytes(data)]
+
+
+class ColumnarWriter:
+    """
+    Writes rows to a columnar file batch by batch, so the whole table never has to be held in memory.
+    """
+
+    def __init__(self, file: BinaryIO, columns: List[Dict[str, str]]):
+        for column in columns:
+            if column['type'] not in COLUMN_TYPES:
+                raise ValueError(f"Unsupported column type {column['type']} for column {column['name']}")
+        self.file = file
+        self.columns = columns
+        schema = json.dumps({'columns': columns}).encode('utf-8')
+        file.write(MAGIC + struct.pack('<H', FORMAT_VERSION))
+        file.write(struct.pack('<I', len(schema)))
+        file.write(schema)
+
+    def write_batch(self, rows: Sequence[Sequence]):
+        if not rows:
+            return
+        self.file.write(struct.pack('<I', len(rows)))
+        for position, column in enumerate(self.columns):
+            values = [row[position] for row in rows]
+            _write_buffer(self.file, bytes(0 if value is None else 1 for value in values))
+            for buffer in _encode_values(column['type'], values):
+                _write_buffer(self.file, buffer)
+
+    def close(self):
+        self.file.write(struct.pack('<I', 0))
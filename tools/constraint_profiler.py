@@ -0,0 +1,302 @@
+"""
+Opt-in profiler of constraint streams.
+
+ConstraintProfiler.constraint_provider(module) builds a constraint provider from define_constraint_list of a constraints
+module in which every Python function passed to a stream, a joiner or a collector (filters, mappings, match weights)
+is wrapped with a call counter and a timer. The time is attributed to the constraint function of the module that
+created the stream, e.g. technician_capacity_hard. The wrappers keep the number of parameters of the wrapped
+function, because the solver chooses the Java functional interface by the arity.
+
+The score calculation count and speed are not exposed by the Timefold Python API, so they are read from the
+"Solving ended" line logged by the solver to the 'timefold.solver' logger (level INFO).
+
+The module has no imports from this repository, so it can be used by both tools/main.py and rbh_solver/main.py.
+Run it directly (python constraint_profiler.py) to check that nested constraint functions are counted once.
+"""
+from typing import Dict, Optional, Tuple
+import inspect
+import json
+import logging
+import re
+from time import perf_counter_ns
+import pandas as pd
+from timefold.solver.score import constraint_provider
+
+# Methods of the constraint builders that finish a constraint; their result is not a stream
+FINAL_METHODS = ('as_constraint', 'as_constraint_descriptively')
+
+# Statistics of the solver from its last log line, e.g. "Solving ended: time spent (1000), ...,
+# move evaluation speed (2000/sec), ..." (older versions: "score calculation speed")
+SOLVING_ENDED_PATTERN = re.compile(r'Solving ended: time spent \((\d+)\).*?(?:move evaluation|score calculation) speed \((\d+)/sec\)')
+
+# Wrappers calling call(*args) with the exact number of parameters of the wrapped function
+_ARITY_WRAPPERS = {
+    1: lambda call: lambda a: call(a),
+    2: lambda call: lambda a, b: call(a, b),
+    3: lambda call: lambda a, b, c: call(a, b, c),
+    4: lambda call: lambda a, b, c, d: call(a, b, c, d),
+    5: lambda call: lambda a, b, c, d, e: call(a, b, c, d, e),
+}
+
+
+class _Stats:
+    __slots__ = ('calls', 'nanoseconds')
+
+    def __init__(self):
+        self.calls = 0
+        self.nanoseconds = 0
+
+
+def _arity(function) -> Optional[int]:
+    try:
+        parameters = inspect.signature(function).parameters.values()
+    except (TypeError, ValueError):
+        return None
+    if any(parameter.kind in (parameter.VAR_POSITIONAL, parameter.KEYWORD_ONLY, parameter.VAR_KEYWORD)
+           for parameter in parameters):
+        return None
+    return len(parameters)
+
+
+class _SolvingEndedHandler(logging.Handler):
+    """
+    Keeps the time spent and the score calculation speed from the last "Solving ended" log line of the solver.
+    """
+
+    def __init__(self):
+        super().__init__(logging.INFO)
+        self.counts: Optional[Tuple[int, int]] = None
+
+    def emit(self, record: logging.LogRecord):
+        match = SOLVING_ENDED_PATTERN.search(record.getMessage())
+        if match:
+            self.counts = int(match.group(1)), int(match.group(2))
+
+
+class _Proxy:
+    """
+    Proxy of a constraint factory, stream or constraint builder: wraps the functions passed to its methods
+    and returns proxies of the resulting streams.
+    """
+
+    def __init__(self, target, profiler: 'ConstraintProfiler'):
+        self._target = target
+        self._profiler = profiler
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._target, name)
+        if not callable(attribute):
+            return attribute
+
+        def method(*args, **kwargs):
+            result = attribute(*self._profiler.wrap_arguments(args), **kwargs)
+            return result if name in FINAL_METHODS else _Proxy(result, self._profiler)
+        return method
+
+
+class _ArgumentsProxy:
+    """
+    Proxy of Joiners or ConstraintCollectors: wraps the functions passed to their factory methods.
+    """
+
+    def __init__(self, target, profiler: 'ConstraintProfiler'):
+        self._target = target
+        self._profiler = profiler
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._target, name)
+        if not callable(attribute):
+            return attribute
+        return lambda *args, **kwargs: attribute(*self._profiler.wrap_arguments(args), **kwargs)
+
+
+class ConstraintProfiler:
+    """
+    Class ConstraintProfiler counts the calls and the time of the Python functions of every constraint.
+    """
+
+    def __init__(self):
+        self.stats: Dict[str, _Stats] = {}
+        self._current = 'define_constraint_list'
+        self._solver_log = _SolvingEndedHandler()
+        logging.getLogger('timefold.solver').addHandler(self._solver_log)
+
+    def timed(self, function):
+        """
+        Returns function wrapped with the counter and the timer of the current constraint, with the same arity.
+        Classes, stream proxies, already timed functions and functions of unknown arity are returned unchanged
+        (proxies are unwrapped).
+        """
+        if isinstance(function, (_Proxy, _ArgumentsProxy)):
+            return function._target
+        if isinstance(function, type) or not callable(function) or getattr(function, '_profiled', False):
+            return function
+        arity = _arity(function)
+        if arity not in _ARITY_WRAPPERS:
+            return function
+        stats = self.stats.setdefault(self._current, _Stats())
+
+        def call(*args):
+            start = perf_counter_ns()
+            try:
+                return function(*args)
+            finally:
+                stats.calls += 1
+                stats.nanoseconds += perf_counter_ns() - start
+        wrapper = _ARITY_WRAPPERS[arity](call)
+        wrapper._profiled = True
+        return wrapper
+
+    def wrap_arguments(self, args) -> list:
+        return [self.timed(argument) for argument in args]
+
+    def _instrumented(self, name: str, function):
+        """
+        Returns function attributing the time of its streams to name. A constraint function called by another
+        instrumented one (e.g. technician_capacity_overload from technician_capacity_constraints) gets the proxy
+        of the caller unchanged, so that its functions are not wrapped and counted twice.
+        """
+        def constraint_function(constraint_factory, *args, **kwargs):
+            previous, self._current = self._current, name
+            if not isinstance(constraint_factory, _Proxy):
+                constraint_factory = _Proxy(constraint_factory, self)
+            try:
+                return function(constraint_factory, *args, **kwargs)
+            finally:
+                self._current = previous
+        return constraint_function
+
+    def constraint_provider(self, module):
+        """
+        Builds a profiled constraint provider from module.define_constraint_list. While the constraints are built,
+        the constraint functions of the module (functions with the first parameter constraint_factory) and its
+        Joiners and ConstraintCollectors are temporarily replaced by instrumented versions.
+
+        Params:
+        module: the constraints module, e.g. tools/constraints.py or rbh_solver/constraints.py.
+        """
+        constraint_functions = {
+            name: function for name, function in vars(module).items()
+            if inspect.isfunction(function) and function.__module__ == module.__name__
+            and name not in ('define_constraints', 'define_constraint_list')
+            and next(iter(inspect.signature(function).parameters), None) == 'constraint_factory'
+        }
+
+        @constraint_provider
+        def profiled_constraints(constraint_factory):
+            originals = dict(constraint_functions)
+            for name in ('Joiners', 'ConstraintCollectors'):
+                if hasattr(module, name):
+                    originals[name] = getattr(module, name)
+                    setattr(module, name, _ArgumentsProxy(originals[name], self))
+            for name, function in constraint_functions.items():
+                setattr(module, name, self._instrumented(name, function))
+            try:
+                return module.define_constraint_list(constraint_factory)
+            finally:
+                for name, original in originals.items():
+                    setattr(module, name, original)
+
+        return profiled_constraints
+
+    def report(self, output_format: str = 'table') -> str:
+        """
+        Returns the calls and the time of every constraint, sorted by the time, as a table or as JSON.
+        The score calculation count and speed come from the "Solving ended" log line of the last solve; without it
+        (e.g. the 'timefold.solver' logger above INFO) they are reported as unavailable.
+        The log handler is removed (close), so the report is made once, after the solve.
+
+        Params:
+        output_format: str, 'table' or 'json'.
+        """
+        self.close()
+        score_calculation_count, milliseconds = self._solver_counts()
+        total = sum(stats.nanoseconds for stats in self.stats.values()) or 1
+        rows = [{
+            'constraint': name,
+            'calls': stats.calls,
+            'total_ms': round(stats.nanoseconds / 1e6, 3),
+            'per_call_us': round(stats.nanoseconds / stats.calls / 1e3, 3) if stats.calls else None,
+            'per_move_us': round(stats.nanoseconds / score_calculation_count / 1e3, 3) if score_calculation_count else None,
+            'share_pct': round(100 * stats.nanoseconds / total, 1),
+        } for name, stats in sorted(self.stats.items(), key=lambda item: item[1].nanoseconds, reverse=True)]
+        summary = {
+            'score_calculation_count': score_calculation_count,
+            'score_calculation_speed_per_s': round(score_calculation_count / (milliseconds / 1000))
+            if score_calculation_count and milliseconds else None,
+            'constraints': rows,
+        }
+        if output_format == 'json':
+            return json.dumps(summary, indent=2)
+        if output_format != 'table':
+            raise ValueError(f"Unknown output format {output_format}, expected 'table' or 'json'")
+        solver_counts = (f"Score calculations: {summary['score_calculation_count']}, "
+                         f"speed: {summary['score_calculation_speed_per_s']}/s"
+                         if score_calculation_count is not None else
+                         "Score calculations: unavailable (no 'Solving ended' line logged by 'timefold.solver' "
+                         "at level INFO)")
+        return (solver_counts + "\n"
+                + (pd.DataFrame(rows).to_string(index=False) if rows else "No constraint function was called."))
+
+    def close(self):
+        """
+        Removes the handler of the solver log added by the constructor; called by report().
+        """
+        logging.getLogger('timefold.solver').removeHandler(self._solver_log)
+
+    def __enter__(self) -> 'ConstraintProfiler':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _solver_counts(self) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Score calculation count and time spent in milliseconds of the last solve, or (None, None) with a warning.
+        """
+        if self._solver_log.counts is None:
+            logging.getLogger(__name__).warning(
+                "Score calculation count is unavailable: the solver did not log 'Solving ended' at level INFO.")
+            return None, None
+        milliseconds, speed = self._solver_log.counts
+        return speed * milliseconds // 1000, milliseconds
+
+
+class _CheckStream:
+    """
+    Stream of check_nested_calls: applies every filter immediately to its items.
+    """
+
+    def __init__(self, items: list):
+        self.items = items
+
+    def for_each(self, _):
+        return _CheckStream(list(self.items))
+
+    def filter(self, predicate):
+        return _CheckStream([item for item in self.items if predicate(item)])
+
+    def as_constraint(self, _):
+        return self.items
+
+
+def check_nested_calls() -> Dict[str, int]:
+    """
+    Checks that a constraint function called by another constraint function reports one call of its filter
+    per item, as technician_capacity_overload called by technician_capacity_constraints.
+    Returns the number of calls of every constraint.
+    """
+    def inner(constraint_factory):
+        return constraint_factory.for_each(int).filter(lambda item: item > 0).as_constraint('inner')
+
+    with ConstraintProfiler() as profiler:
+        instrumented_inner = profiler._instrumented('inner', inner)
+        profiler._instrumented('outer', lambda constraint_factory: instrumented_inner(constraint_factory))(
+            _CheckStream([1]))
+    calls = {name: stats.calls for name, stats in profiler.stats.items()}
+    assert calls == {'inner': 1}, f"Expected one call of the nested constraint function, got {calls}"
+    return calls
+
+
+if __name__ == '__main__':
+    print(f"Nested constraint functions counted once: {check_nested_calls()}")
@@ -1,13 +1,14 @@
-from timefold.solver.score import constraint_provider, HardSoftScore, ConstraintFactory, Joiners, ConstraintCollectors
-from domain import Device, Technician
+from timefold.solver.score import constraint_provider, HardMediumSoftScore, ConstraintFactory, Joiners, ConstraintCollectors
+from domain import Device, Technician, Score
+from scoring import capacity_penalty
+from settings import CAPACITY_PENALTY_LEVEL
 
-@constraint_provider
-def define_constraints(constraint_factory: ConstraintFactory):
+def define_constraint_list(constraint_factory: ConstraintFactory):
     return [
-        # HARD constraints
+        # HARD (and MEDIUM) constraints
         #technician_capacity_hard(constraint_factory),
-        technician_capacity_hard(constraint_factory),
-        technician_skill_conflict(constraint_factory),
+        *technician_capacity_constraints(constraint_factory),
+        # the technician's IUM is enforced by the per-device value range (Device.eligible_technicians)
 
         # SOFT constraints
         assign_technician_soft_constraint(constraint_factory),
@@ -16,27 +17,47 @@ def define_constraints(constraint_factory: ConstraintFactory):
     ]
 
 
-def technician_skill_conflict(constraint_factory: ConstraintFactory):
+@constraint_provider
+def define_constraints(constraint_factory: ConstraintFactory):
+    return define_constraint_list(constraint_factory)
+
+
+def technician_capacity_hard(constraint_factory: ConstraintFactory):
     """
-    Penalizuje, jeśli technik nie posiada wymaganej umiejętności (IUM) dla przypisanego urządzenia.
+    Penalizuje, jeśli technik ma przydzielone wiecej rbh niż jego limit rbh_do_zaplanowania
     """
     return (constraint_factory
             .for_each(Device)
-            .filter(lambda device: device.technician is not None and not device.technician.has_ium(device.ium))
-            .penalize(HardSoftScore.ONE_HARD)
-            .as_constraint("Technician skill conflict"))
+            .filter(lambda device: device.technician is not None)
+            .group_by(lambda device: device.technician, ConstraintCollectors.sum(lambda device: device.rbh_norma))
+            .filter(lambda technician, total_rbh_norma: total_rbh_norma > technician.rbh_do_zaplanowania)
+            .penalize(Score.ONE_HARD)
+            .as_constraint("Technician capacity (hard constraint)"))
 
-def technician_capacity_hard(constraint_factory: ConstraintFactory):
+def technician_capacity_overload(constraint_factory: ConstraintFactory):
     """
-    Penalizuje, jeśli technik ma przydzielone wiecej rbh niż jego limit rbh_do_zaplanowania
+    Penalizuje przekroczenie limitu rbh_do_zaplanowania karą rosnącą z wielkością przekroczenia (capacity_penalty),
+    dzięki czemu solver widzi poprawę także wtedy, gdy przekroczenie maleje, ale jeszcze nie znika.
+    Obciążenie technika jest sumowane przyrostowo przez ConstraintCollectors.sum: ruch zmienia tylko sumy dwóch techników.
     """
+    weight = HardMediumSoftScore.ONE_MEDIUM if CAPACITY_PENALTY_LEVEL == 'medium' else Score.ONE_HARD
     return (constraint_factory
             .for_each(Device)
             .filter(lambda device: device.technician is not None)
             .group_by(lambda device: device.technician, ConstraintCollectors.sum(lambda device: device.rbh_norma))
             .filter(lambda technician, total_rbh_norma: total_rbh_norma > technician.rbh_do_zaplanowania)
-            .penalize(HardSoftScore.ONE_HARD)
-            .as_constraint("Technician capacity (hard constraint)"))
+            .penalize(weight, lambda technician, total_rbh_norma:
+                      capacity_penalty(total_rbh_norma - technician.rbh_do_zaplanowania))
+            .as_constraint("Technician capacity overload"))
+
+def technician_capacity_constraints(constraint_factory: ConstraintFactory):
+    """
+    Ograniczenia limitu techników: przy CAPACITY_PENALTY_LEVEL = 'medium' wynik hard liczy przeciążonych techników,
+    a kara zależna od przekroczenia jest na poziomie medium; w przeciwnym razie ta kara jest wynikiem hard.
+    """
+    if CAPACITY_PENALTY_LEVEL == 'medium':
+        return [technician_capacity_hard(constraint_factory), technician_capacity_overload(constraint_factory)]
+    return [technician_capacity_overload(constraint_factory)]
 ###############################################
 
 ######################################################
@@ -48,7 +69,7 @@ def assign_technician_soft_constraint(constraint_factory: ConstraintFactory):
     return (constraint_factory
             .for_each(Device)
             .filter(lambda device: device.technician is not None)  # Urządzenie ma przypisanego technika
-            .reward(HardSoftScore.ONE_SOFT)  # Nagroda za przypisanie technika
+            .reward(Score.ONE_SOFT)  # Nagroda za przypisanie technika
             .as_constraint("Assign technician to as many devices as possible"))
 
 
@@ -59,7 +80,7 @@ def prioritize_earlier_deliveries(constraint_factory: ConstraintFactory):
     return (constraint_factory
             .for_each(Device)
             .filter(lambda device: device.technician is not None)  # Tylko przypisane urządzenia
-            .reward(HardSoftScore.ONE_SOFT,
+            .reward(Score.ONE_SOFT,
                     lambda device: days_until_delivery(device.dni_w_om))  # Nagroda za wcześniejsze przypisanie
             .as_constraint("Prioritize earlier deliveries"))
 
@@ -79,6 +100,6 @@ def assign_technician_soft_constraint_dni_om(constraint_factory: ConstraintFacto
             .filter(lambda device: device.technician is not None)  # Urządzenie ma przypisanego technika
             .group_by(lambda device: device.technician,  # Grupowanie po technikach
                       ConstraintCollectors.min(lambda device: device.dni_w_om))  # Zbieranie minimalnej wartości dni_w_om
-            .reward(HardSoftScore.ONE_SOFT,
+            .reward(Score.ONE_SOFT,
                     lambda technician, min_dni_w_om: min_dni_w_om)  # Nagroda równa minimalnej wartości dni_w_om
             .as_constraint("Assign technician to devices based on minimum dni_w_om"))
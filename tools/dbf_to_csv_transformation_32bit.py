@@ -18,13 +18,14 @@ Please ensure that these packages are installed within your active Python enviro
 
 Additionally, the pandas package, which is used for data manipulation and analysis, needs to be installed globally for 64-bits in the venv environment. This dependency exists because pandas does not run on 32-bit python, and we need to leverage its powerful data analysis and manipulation capabilities.
 """
-from typing import Optional, Dict
+from typing import Optional, Dict, Sequence
 import os
 import csv
 import pyodbc
 import sys
 import settings
 import logging
+from columnar_format import ColumnarWriter, column_type_from_description, FILE_EXTENSION as COLUMNAR_FILE_EXTENSION
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -147,6 +148,193 @@ def trim_string_data(raw_data: list[Dict]) -> list[Dict]:
         raise
 
 
+def trim_string_row(row: Sequence) -> tuple:
+    """
+    Remove leading and trailing spaces of string values in a single fetched row.
+
+    Parameters
+    ----------
+    row : Sequence
+        The row returned by the cursor.
+    """
+    return tuple(value.strip() if isinstance(value, str) else value for value in row)
+
+
+def stream_query_to_csv(connection_object: pyodbc.Connection, sql_code: str, csv_file_location: str,
+                        batch_size: int = 10000) -> int:
+    """
+    Execute a SQL query and write its result to a CSV file batch by batch.
+
+    Rows are fetched with fetchmany, trimmed and written immediately, so at most one batch
+    is held in memory regardless of the table size. The data is written to a temporary
+    file which replaces the target only after the whole result has been written, so
+    the reader never sees a partially written CSV. Returns the number of written rows.
+
+    Parameters
+    ----------
+    connection_object : pyodbc.Connection
+        The connection object to execute the SQL query on.
+    sql_code : str
+        The SQL code to execute.
+    csv_file_location : str
+        The location of the CSV file to write data into.
+    batch_size : int
+        The number of rows fetched and written at a time, 10000 by default
+    """
+    csv_dir = os.path.dirname(csv_file_location)
+    if not os.path.exists(csv_dir):
+        os.makedirs(csv_dir)
+        logging.info(f"Directory {csv_dir} created.")
+
+    temporary_file_location = f"{csv_file_location}.part"
+    row_count = 0
+    try:
+        db_cursor = connection_object.cursor()
+        db_cursor.execute(sql_code)
+        result_columns = [column[0] for column in db_cursor.description]
+
+        with open(temporary_file_location, 'w', newline='', encoding='utf-8') as file:
+            csv_writer = csv.writer(file, escapechar='\\')
+            csv_writer.writerow(result_columns)
+            while True:
+                rows = db_cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                csv_writer.writerows(trim_string_row(row) for row in rows)
+                row_count += len(rows)
+
+        os.replace(temporary_file_location, csv_file_location)
+        logging.info(f"Streamed {row_count} rows to CSV file at location: {csv_file_location}")
+        return row_count
+    except Exception as e:
+        logging.error(f"Error streaming SQL query result to CSV file: {e}")
+        if os.path.exists(temporary_file_location):
+            os.remove(temporary_file_location)
+        raise
+
+
+def convert_dbf_to_csv_streamed(dbf_file_location: str, csv_file_location: str, batch_size: int = 10000) -> int:
+    """
+    Convert a .dbf file to a CSV file using ODBC without loading the whole table into memory.
+
+    Parameters
+    ----------
+    dbf_file_location : str
+        The .dbf file location to convert.
+    csv_file_location : str
+        The location of the CSV file to write data into.
+    batch_size : int
+        The number of rows fetched and written at a time, 10000 by default
+    """
+    try:
+        table_name, connection_data = extract_dbf_file_details(dbf_file_location)
+        sql_code = f'SELECT * FROM {table_name}'
+        connection_object = establish_dbf_connection(connection_data)
+        with connection_object:
+            return stream_query_to_csv(connection_object, sql_code, csv_file_location, batch_size)
+    except Exception as e:
+        logging.error(f"Error converting DBF to CSV in streaming mode: {e}")
+        raise
+
+
+def stream_query_to_columnar(connection_object: pyodbc.Connection, sql_code: str, output_file_location: str,
+                             batch_size: int = 10000) -> int:
+    """
+    Execute a SQL query and write its result to a typed columnar file batch by batch.
+
+    Column types are taken from the cursor description, so dates, numbers and strings keep
+    their types and the 64-bit loader does not have to parse text. Columns listed in
+    settings.STRING_COLUMN_LIST are always stored as strings. As in stream_query_to_csv
+    only one batch is held in memory and the target file is replaced when complete.
+    Returns the number of written rows.
+
+    Parameters
+    ----------
+    connection_object : pyodbc.Connection
+        The connection object to execute the SQL query on.
+    sql_code : str
+        The SQL code to execute.
+    output_file_location : str
+        The location of the columnar file to write data into.
+    batch_size : int
+        The number of rows fetched and written at a time, 10000 by default
+    """
+    output_dir = os.path.dirname(output_file_location)
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+        logging.info(f"Directory {output_dir} created.")
+
+    temporary_file_location = f"{output_file_location}.part"
+    row_count = 0
+    try:
+        db_cursor = connection_object.cursor()
+        db_cursor.execute(sql_code)
+        result_columns = [{'name': description[0],
+                           'type': column_type_from_description(description, settings.STRING_COLUMN_LIST)}
+                          for description in db_cursor.description]
+
+        with open(temporary_file_location, 'wb') as file:
+            columnar_writer = ColumnarWriter(file, result_columns)
+            while True:
+                rows = db_cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                columnar_writer.write_batch(rows)
+                row_count += len(rows)
+            columnar_writer.close()
+
+        os.replace(temporary_file_location, output_file_location)
+        logging.info(f"Streamed {row_count} rows to columnar file at location: {output_file_location}")
+        return row_count
+    except Exception as e:
+        logging.error(f"Error streaming SQL query result to columnar file: {e}")
+        if os.path.exists(temporary_file_location):
+            os.remove(temporary_file_location)
+        raise
+
+
+def convert_dbf_to_columnar_streamed(dbf_file_location: str, output_file_location: str, batch_size: int = 10000) -> int:
+    """
+    Convert a .dbf file to a typed columnar file using ODBC without loading the whole table into memory.
+
+    Parameters
+    ----------
+    dbf_file_location : str
+        The .dbf file location to convert.
+    output_file_location : str
+        The location of the columnar file to write data into.
+    batch_size : int
+        The number of rows fetched and written at a time, 10000 by default
+    """
+    try:
+        table_name, connection_data = extract_dbf_file_details(dbf_file_location)
+        sql_code = f'SELECT * FROM {table_name}'
+        connection_object = establish_dbf_connection(connection_data)
+        with connection_object:
+            return stream_query_to_columnar(connection_object, sql_code, output_file_location, batch_size)
+    except Exception as e:
+        logging.error(f"Error converting DBF to columnar file: {e}")
+        raise
+
+
+def parse_command_line_arguments(arguments: list[str]) -> Dict[str, str]:
+    """
+    Parse command line arguments given as key=value pairs.
+
+    Parameters
+    ----------
+    arguments : list[str]
+        The command line arguments without the script name.
+    """
+    parsed_arguments = {}
+    for argument in arguments:
+        key, separator, value = argument.partition('=')
+        if not separator:
+            raise ValueError(f'Invalid argument "{argument}", expected key=value.')
+        parsed_arguments[key.strip()] = value
+    return parsed_arguments
+
+
 def write_dict_list_to_csv_chunked(data_list: list[dict], csv_file_location: str, chunk_limit: int = 10000):
     """
     Write a list of dictionaries to a CSV file in chunks to prevent memory errors.
@@ -194,13 +382,19 @@ if __name__ == '__main__':
     
     It expects a valid path to DBF file via command line arguments, and performs necessary 
     transformations and write the final output to the CSV file.
+    Optional arguments: export_mode=stream|full (settings.ODBC_EXPORT_MODE by default),
+    batch_size=<rows> (settings.ODBC_FETCH_BATCH_SIZE by default) and output_format=csv|columnar
+    (settings.ODBC_INTERCHANGE_FORMAT by default). The columnar output is always streamed.
     """
     try:
         if len(sys.argv) <= 1 or not sys.argv[1].strip():
             raise ValueError('Please provide a path to the DBF file via the command line.')
 
-        sys_arg_split = sys.argv[1].split('=')
-        dbf_file_location = sys_arg_split[1]
+        arguments = parse_command_line_arguments(sys.argv[1:])
+        dbf_file_location = arguments.get('dbf_file_path', '')
+        export_mode = arguments.get('export_mode', settings.ODBC_EXPORT_MODE)
+        batch_size = int(arguments.get('batch_size', settings.ODBC_FETCH_BATCH_SIZE))
+        output_format = arguments.get('output_format', settings.ODBC_INTERCHANGE_FORMAT)
 
         if not dbf_file_location or not dbf_file_location.strip():
             raise ValueError('The DBF file location provided cannot be empty.')
@@ -208,14 +402,25 @@ if __name__ == '__main__':
         if not os.path.exists(dbf_file_location):
             raise FileNotFoundError(f'The DBF file at path "{dbf_file_location}" does not exist.')
 
-        csv_file_location = os.path.abspath(os.path.join(settings.CSV_FILES_PATH,
-                                                         f"{os.path.splitext(os.path.basename(dbf_file_location))[0]}.csv"))
-
-        raw_data = convert_dbf_to_dict_list(dbf_file_location=dbf_file_location)
-        if raw_data is not None:
-            trimmed_data = trim_string_data(raw_data)
-            write_dict_list_to_csv_chunked(trimmed_data, csv_file_location)
+        table_file_name = os.path.splitext(os.path.basename(dbf_file_location))[0]
+        csv_file_location = os.path.abspath(os.path.join(settings.CSV_FILES_PATH, f"{table_file_name}.csv"))
+
+        if output_format == 'columnar':
+            output_file_location = os.path.abspath(os.path.join(settings.CSV_FILES_PATH,
+                                                                f"{table_file_name}{COLUMNAR_FILE_EXTENSION}"))
+            convert_dbf_to_columnar_streamed(dbf_file_location, output_file_location, batch_size)
+        elif output_format != 'csv':
+            raise ValueError(f'Unknown output format "{output_format}", expected "csv" or "columnar".')
+        elif export_mode == 'stream':
+            convert_dbf_to_csv_streamed(dbf_file_location, csv_file_location, batch_size)
+        elif export_mode == 'full':
+            raw_data = convert_dbf_to_dict_list(dbf_file_location=dbf_file_location)
+            if raw_data is not None:
+                trimmed_data = trim_string_data(raw_data)
+                write_dict_list_to_csv_chunked(trimmed_data, csv_file_location, batch_size)
+            else:
+                logging.info("DBF to dictionary conversion resulted in None, no CSV file will be created.")
         else:
-            logging.info("DBF to dictionary conversion resulted in None, no CSV file will be created.")
+            raise ValueError(f'Unknown export mode "{export_mode}", expected "stream" or "full".')
     except Exception as e:
         logging.error(f"Error running script: {e}")
@@ -0,0 +1,153 @@
+from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+import time
+from timefold.solver import SolverFactory
+from timefold.solver.config import TerminationConfig, Duration
+from domain import DeviceSchedule, Device, Technician, Score
+from scoring import calculate_score
+from solver_config import create_solver_config
+from settings import SOLVER_THREAD_COUNT, EXACT_SOLVE_MAX_COMBINATIONS, COMPONENT_SPENT_LIMIT_SECONDS, \
+    COMPONENT_UNIMPROVED_SECONDS
+
+Assignment = Dict[int, Optional[int]]  # Device.index -> Technician.id (None = nieprzypisane)
+
+
+@dataclass
+class Component:
+    """
+    Niezależna część problemu: technicy połączeni wspólnymi IUM i urządzenia z tymi IUM.
+    Urządzenia i technicy z różnych komponentów nie wpływają na swoje ograniczenia.
+    """
+    technicians: List[Technician] = field(default_factory=list)
+    devices: List[Device] = field(default_factory=list)
+
+    def combinations(self, limit: int) -> int:
+        """
+        Liczba wszystkich przydziałów (każde urządzenie: jeden z uprawnionych techników lub brak), obcięta do limit + 1.
+        """
+        count = 1
+        for device in self.devices:
+            count *= len(device.eligible_technicians) + 1
+            if count > limit:
+                return limit + 1
+        return count
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent: Dict[str, str] = {}
+
+    def add(self, item: str):
+        self.parent.setdefault(item, item)
+
+    def find(self, item: str) -> str:
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, first: str, second: str):
+        self.parent[self.find(first)] = self.find(second)
+
+
+def find_components(technicians: List[Technician], devices: List[Device]) -> Tuple[List[Component], List[Device]]:
+    """
+    Dzieli dwudzielny graf urządzenie–technik (krawędź = wspólne IUM) na spójne składowe.
+    Zwraca składowe z co najmniej jednym urządzeniem, od największej, oraz urządzenia bez żadnego uprawnionego technika.
+    """
+    union_find = _UnionFind()
+    for technician in technicians:
+        iums = list(technician.iums)
+        for ium in iums:
+            union_find.add(ium)
+            union_find.union(ium, iums[0])
+
+    components: Dict[str, Component] = {}
+    for technician in technicians:
+        if technician.iums:
+            components.setdefault(union_find.find(next(iter(technician.iums))), Component()).technicians.append(technician)
+    unassignable = []
+    for device in devices:
+        if device.ium in union_find.parent:
+            components[union_find.find(device.ium)].devices.append(device)
+        else:
+            unassignable.append(device)
+    result = [component for component in components.values() if component.devices]
+    return sorted(result, key=lambda component: len(component.devices), reverse=True), unassignable
+
+
+def solve_exact(component: Component) -> Assignment:
+    """
+    Przegląda wszystkie przydziały małej składowej i wybiera najlepszy według calculate_score.
+    """
+    choices = [[None] + list(device.eligible_technicians) for device in component.devices]
+    best_score, best_choice = None, None
+    for choice in product(*choices):
+        for device, technician in zip(component.devices, choice):
+            device.technician = technician
+        score = calculate_score(component.devices)
+        if best_score is None or score > best_score:
+            best_score, best_choice = score, choice
+    return {device.index: technician.id if technician is not None else None
+            for device, technician in zip(component.devices, best_choice)}
+
+
+def solve_component(technicians: List[Technician], devices: List[Device], spent_seconds: int,
+                    unimproved_seconds: int) -> Assignment:
+    """
+    Rozwiązuje jedną składową solverem Timefold. Funkcja jest wywoływana także w procesach roboczych,
+    dlatego przyjmuje i zwraca tylko dane, które można serializować.
+    """
+    termination_config = TerminationConfig(spent_limit=Duration(seconds=spent_seconds),
+                                           unimproved_spent_limit=Duration(seconds=unimproved_seconds))
+    solver = SolverFactory.create(create_solver_config(termination_config)).build_solver()
+    solution = solver.solve(DeviceSchedule("component", technicians, devices))
+    return {device.index: device.technician.id if device.technician is not None else None
+            for device in solution.device_list}
+
+
+def solve_decomposed(technicians: List[Technician], devices: List[Device],
+                     spent_seconds: int = COMPONENT_SPENT_LIMIT_SECONDS,
+                     unimproved_seconds: int = COMPONENT_UNIMPROVED_SECONDS,
+                     max_workers: Optional[int] = SOLVER_THREAD_COUNT) -> DeviceSchedule:
+    """
+    Rozwiązuje problem po składowych: małe składowe dokładnie (przegląd wszystkich przydziałów),
+    pozostałe solverem Timefold równolegle w osobnych procesach, a następnie scala przydziały w jedno rozwiązanie.
+    """
+    start = time.perf_counter()
+    components, unassignable = find_components(technicians, devices)
+    exact_components = [component for component in components
+                        if component.combinations(EXACT_SOLVE_MAX_COMBINATIONS) <= EXACT_SOLVE_MAX_COMBINATIONS]
+    solver_components = [component for component in components if component not in exact_components]
+    print(f"Problem split into {len(components)} components "
+          f"(largest: {len(components[0].devices) if components else 0} devices), "
+          f"{len(exact_components)} solved exactly, {len(solver_components)} with the solver, "
+          f"{len(unassignable)} devices without an eligible technician.")
+
+    assignment: Assignment = {}
+    for component in exact_components:
+        assignment.update(solve_exact(component))
+
+    if len(solver_components) == 1 or max_workers == 1:
+        for component in solver_components:
+            assignment.update(solve_component(component.technicians, component.devices, spent_seconds,
+                                              unimproved_seconds))
+    elif solver_components:
+        with ProcessPoolExecutor(max_workers=min(max_workers or len(solver_components), len(solver_components))) as executor:
+            futures = [executor.submit(solve_component, component.technicians, component.devices, spent_seconds,
+                                       unimproved_seconds)
+                       for component in solver_components]
+            for future in futures:
+                assignment.update(future.result())
+
+    technicians_by_id = {technician.id: technician for technician in technicians}
+    for device in devices:
+        technician_id = assignment.get(device.index)
+        device.technician = technicians_by_id[technician_id] if technician_id is not None else None
+    score = Score.of(*(int(level) for level in calculate_score(devices)))
+    print(f"Decomposed solve finished in {time.perf_counter() - start:.1f} s.")
+    return DeviceSchedule("schedule1", technicians, devices, score)
@@ -1,12 +1,36 @@
 import pandas as pd
 import numpy as np
-import os
-import ast  # Import dla funkcji literal_eval do konwersji stringów na listy
-from tools.settings import INDEX_PRACOWNI, EXCLUDED_WORDS_LIST
+import re
+from tools.settings import INDEX_PRACOWNI, EXCLUDED_WORDS_LIST, PROBLEM_SNAPSHOT_PATH
 from tools.ODBCDataLoader import DataLoader
+from tools.lazy_query import LazyFrame
+from tools.problem_snapshot import load_problem_snapshot, save_problem_snapshot, problem_source_fingerprint
+from tools.indeks_hierarchy import IndeksHierarchy
 
 pd.set_option("display.max_columns", None)
 
+
+def compile_excluded_words_pattern(words) -> re.Pattern:
+    """
+    Builds one case-insensitive regular expression matching any of the words, so a remark is scanned once
+    regardless of the number of words. Longer words come first, so the most specific word is reported.
+    """
+    unique_words = sorted({word.strip() for word in words if word.strip()}, key=lambda word: (-len(word), word))
+    if not unique_words:
+        return re.compile(r'(?!)')
+    return re.compile('(' + '|'.join(re.escape(word) for word in unique_words) + ')', re.IGNORECASE)
+
+
+def match_excluded_words(remarks: pd.Series, words=EXCLUDED_WORDS_LIST) -> pd.Series:
+    """
+    Returns the excluded word found in every remark (in the spelling from the list), NaN where none matched.
+    """
+    pattern = compile_excluded_words_pattern(words)
+    spelling = {word.strip().casefold(): word.strip() for word in words}
+    matched = remarks.astype(object).str.extract(pattern, expand=False)
+    return matched.str.casefold().map(spelling)
+
+
 class DevicesDataProcessor:
     """
     This class processes device data, including filtering, adding columns, and performing merges.
@@ -14,11 +38,17 @@ class DevicesDataProcessor:
 
     def __init__(self):
         self.columns_to_use_in_ksiazka_k = ['bk_id', 'pr_id', 'p_nr_fab', 'p_typ', 'u_nazwa_s', 'k_do_k_n', 'k_do_nazw', 'k_do_datap', 'k_uwagi', 'indeks']
+        # Devices for calibration in the specified lab, not yet taken from BOK (most selective filter first)
+        self.filters_for_ksiazka_k = [('pr_id', '==', INDEX_PRACOWNI), ('k_do_datap', 'isnull', None), ('k_do_k_n', '==', 2)]
         self.data_loader = DataLoader()
+        # Devices with the BOK acceptance date; filters and columns are pushed down to the table reads
+        self.devices_query = (LazyFrame.scan(self.data_loader, 'ksiazka_k', self.columns_to_use_in_ksiazka_k)
+                              .filter(*self.filters_for_ksiazka_k)
+                              .join(LazyFrame.scan(self.data_loader, 'bok'), on='bk_id', how='left')
+                              .select(self.columns_to_use_in_ksiazka_k + ['u_data_p']))
+        self.devices_query.prefetch('indexy_4', 'ind4_om')
         self.indexy_4 = self.data_loader.indexy_4
         self.ind4_om = self.data_loader.ind4_om[['indeks', 'p_norma_k']]
-        self.ksiazka_k = self.data_loader.ksiazka_k
-        self.bok = self.data_loader.bok[['bk_id', 'u_data_p']]
 
     def update_indexy_rbh(self):
         """
@@ -32,19 +62,16 @@ class DevicesDataProcessor:
 
     def prepare_ksiazka_k(self):
         """
-        Prepares 'ksiazka_k' dataframe by merging it with 'bok' and 'indexy_4', filtering by calibration devices, and adding necessary columns.
+        Prepares 'ksiazka_k' dataframe joined with 'bok', looking up names and norms in 'indexy_4' and adding necessary columns.
+        Devices for calibration in the specified lab are already selected while loading (filters_for_ksiazka_k).
         """
-        ksiazka_k = pd.merge(self.ksiazka_k[self.columns_to_use_in_ksiazka_k], self.bok, on='bk_id', how='left')
+        ksiazka_k = self.devices_query.collect()
         ksiazka_k['ium'] = ksiazka_k['indeks'].str[:6]
-        ksiazka_k['indeks_8'] = ksiazka_k['indeks'].str[:8]
 
-        # Filter for devices for calibration in the specified lab
-        ksiazka_k = ksiazka_k[(ksiazka_k['k_do_k_n'] == 2) & (ksiazka_k['pr_id'] == INDEX_PRACOWNI) & (ksiazka_k['k_do_datap'].isnull())]
-
-        # Merge with 'indexy_4' for additional data
-        ksiazka_k = pd.merge(ksiazka_k, self.indexy_4[['indeks', 'nazwa']], left_on='indeks_8', right_on='indeks', how='left', suffixes=('', '_drop'))
-        ksiazka_k = ksiazka_k.drop(columns=['indeks_drop'])
-        ksiazka_k = pd.merge(ksiazka_k, self.indexy_4[['indeks', 'p_norma_k']], on='indeks', how='left')
+        # Instrument name from the 8-character level of the index, norm hours from the full index
+        indeks_hierarchy = IndeksHierarchy(self.indexy_4)
+        ksiazka_k['nazwa'] = indeks_hierarchy.names(ksiazka_k['indeks'], level=8)
+        ksiazka_k['p_norma_k'] = indeks_hierarchy.norms(ksiazka_k['indeks'])
 
         # Add 'dni_w_om' column (days in BOK)
         today = pd.Timestamp('today').normalize()
@@ -52,7 +79,7 @@ class DevicesDataProcessor:
         ksiazka_k['dni_w_om'] = (today - ksiazka_k['u_data_p']).dt.days
 
         # Drop unnecessary columns and reorder the dataframe
-        columns_to_drop = ['u_data_p', 'bk_id', 'pr_id', 'k_do_k_n', 'k_do_datap', 'indeks', 'indeks_8']
+        columns_to_drop = ['u_data_p', 'bk_id', 'pr_id', 'k_do_k_n', 'k_do_datap', 'indeks']
         ksiazka_k = ksiazka_k.drop(columns=columns_to_drop)
         columns_order = ['ium', 'dni_w_om', 'nazwa', 'p_typ', 'p_nr_fab', 'k_uwagi', 'u_nazwa_s', 'k_do_nazw', 'p_norma_k']
         return ksiazka_k[columns_order]
@@ -60,17 +87,18 @@ class DevicesDataProcessor:
     def get_devices_in_bok_to_assign(self, ksiazka_k):
         """
         Filters devices in BOK to assign based on missing 'k_do_nazw' and excludes rows with certain words in 'k_uwagi'.
+        Excluded devices are kept in 'held_back_devices' with the matched word in the 'exclusion_reason' column.
         """
-        devices_in_bok_to_assign = ksiazka_k[ksiazka_k['k_do_nazw'].isnull() | (ksiazka_k['k_do_nazw'] == '')]
-        for word in EXCLUDED_WORDS_LIST:
-            devices_in_bok_to_assign = devices_in_bok_to_assign[~devices_in_bok_to_assign['k_uwagi'].str.contains(word, case=False, na=False)]
-        return devices_in_bok_to_assign
+        unassigned_devices = ksiazka_k[ksiazka_k['k_do_nazw'].isnull() | (ksiazka_k['k_do_nazw'] == '')]
+        exclusion_reason = match_excluded_words(unassigned_devices['k_uwagi'])
+        self.held_back_devices = unassigned_devices[exclusion_reason.notna()].assign(exclusion_reason=exclusion_reason)
+        return unassigned_devices[exclusion_reason.isna()]
 
     def get_rbh_for_technician(self, ksiazka_k):
         """
         Groups devices by 'k_do_nazw' and sums 'p_norma_k' for each unique 'k_do_nazw' (technician).
         """
-        rbh_for_pesel = ksiazka_k.groupby('k_do_nazw', as_index=False)['p_norma_k'].sum()
+        rbh_for_pesel = ksiazka_k.groupby('k_do_nazw', as_index=False, observed=True)['p_norma_k'].sum()
         rbh_for_pesel = rbh_for_pesel.rename(columns={'p_norma_k': 'sum_p_norma_k'})
         return rbh_for_pesel.sort_values(by='k_do_nazw', ascending=True)
 
@@ -94,26 +122,25 @@ class TechnicianDataProcessor:
 
     def __init__(self):
         self.data_loader = DataLoader(INDEX_PRACOWNI)
-        self.pers_gr = self.data_loader.pers_gr
-        self.pers_st = self.data_loader.pers_st
+        self.technicians_query = self.build_technicians_query()
+        self.technicians_query.prefetch()
 
-    def merge_personal_data(self) -> pd.DataFrame:
+    def build_technicians_query(self) -> LazyFrame:
         """
-        Merges the personal group dataframe and the state dataframe based on 'l_pesel' (ID).
+        Builds the query joining the personal group and the state tables on 'l_pesel' (ID) and selecting
+        technicians with the right status and ID. The filters are applied while reading the tables.
         """
-        return pd.merge(self.pers_gr, self.pers_st, how='left', left_on='l_pesel', right_on='l_pesel')
-
-    def filter_technicians(self, merged_data: pd.DataFrame) -> pd.DataFrame:
-        """
-        Filters merged data for technicians with the right status and ID.
-        """
-        return merged_data[(merged_data['pr_id'] == INDEX_PRACOWNI) & (merged_data['ium'].notna()) & (~merged_data['zaw']) & (~merged_data['cof']) & (merged_data['l_status_p'] == 2)]
+        return (LazyFrame.scan(self.data_loader, 'pers_gr')
+                .join(LazyFrame.scan(self.data_loader, 'pers_st'), on='l_pesel', how='left')
+                .filter(('pr_id', '==', INDEX_PRACOWNI), ('ium', 'notnull', None), ('zaw', '==', False),
+                        ('cof', '==', False), ('l_status_p', '==', 2))
+                .select(['l_pesel', 'l_nazw_im', 'l_pr_thn', 'pr_id', 'l_norma_p', 'ium']))
 
     def group_technicians(self, filtered_data: pd.DataFrame) -> pd.DataFrame:
         """
         Groups technicians by relevant details and aggregates 'ium' data into lists, sorted alphabetically.
         """
-        grouped_df = filtered_data.groupby(['l_pesel', 'l_nazw_im', 'l_pr_thn', 'pr_id', 'l_norma_p']).agg(
+        grouped_df = filtered_data.groupby(['l_pesel', 'l_nazw_im', 'l_pr_thn', 'pr_id', 'l_norma_p'], observed=True).agg(
             iums=('ium', lambda x: sorted(list(x.dropna())))).reset_index()
 
         self.format_technician_columns(grouped_df)
@@ -139,8 +166,7 @@ class TechnicianDataProcessor:
         """
         Processes technician data through merging, filtering, grouping, and sorting.
         """
-        merged_data = self.merge_personal_data()
-        filtered_data = self.filter_technicians(merged_data)
+        filtered_data = self.technicians_query.collect()
         grouped_data = self.group_technicians(filtered_data)
 
         # Ensure the 'iums' are always sorted after processing.
@@ -159,19 +185,14 @@ class TechnicianDataProcessor:
 def get_technician_and_device_data(use_archive_data=False):
     """
     Initializes and returns both technicians and devices in BOK to assign.
-    Uses archived CSV data if 'use_archive_data' is set to True.
+    Uses the archived problem snapshot if 'use_archive_data' is set to True and the snapshot is not stale.
     """
-    csv_dir = 'CSV_files'
-    technicians_csv_path = os.path.join(csv_dir, 'technicians.csv')
-    devices_csv_path = os.path.join(csv_dir, 'devices_in_bok_to_assign.csv')
-
-    if use_archive_data and os.path.exists(technicians_csv_path) and os.path.exists(devices_csv_path):
-        # Load archived data
-        technicians = pd.read_csv(technicians_csv_path)
-        devices_in_bok_to_assign = pd.read_csv(devices_csv_path)
+    source_fingerprint = problem_source_fingerprint()
+    snapshot = load_problem_snapshot(PROBLEM_SNAPSHOT_PATH, source_fingerprint) if use_archive_data else None
 
-        # Convert 'iums' column back to list format and sort them
-        technicians['iums'] = technicians['iums'].apply(ast.literal_eval).apply(sorted)
+    if snapshot is not None:
+        # Load archived data, 'iums' are stored as sorted lists
+        technicians, devices_in_bok_to_assign = snapshot
     else:
         # Get uncalibrated devices, RBH for technicians, and devices to assign
         uncalibrated_devices_in_bok, assigned_rbh_for_technician, devices_in_bok_to_assign = DevicesDataProcessor.initialize()
@@ -196,11 +217,8 @@ def get_technician_and_device_data(use_archive_data=False):
         devices_in_bok_to_assign = devices_in_bok_to_assign.rename(columns={'p_typ': 'typ', 'p_nr_fab': 'nr_fabryczny', 'u_nazwa_s': 'uzytkownik', 'k_do_nazw': 'technician', 'p_norma_k': 'rbh_norma'})
         devices_in_bok_to_assign = devices_in_bok_to_assign.drop('k_uwagi', axis=1).sort_values(by='dni_w_om', ascending=False)
 
-        # Save data to CSV for future use
-        if not os.path.exists(csv_dir):
-            os.makedirs(csv_dir)
-        technicians.to_csv(technicians_csv_path, index=False)
-        devices_in_bok_to_assign.to_csv(devices_csv_path, index=False)
+        # Save the snapshot for future use
+        save_problem_snapshot(PROBLEM_SNAPSHOT_PATH, technicians, devices_in_bok_to_assign, source_fingerprint)
 
     return technicians, devices_in_bok_to_assign
 
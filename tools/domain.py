@@ -1,11 +1,16 @@
 from dataclasses import dataclass, field
-from typing import Annotated, Set, List, Dict, Union
+from functools import lru_cache
+from typing import Annotated, Set, List, Dict, Union, Tuple
 from pandas import DataFrame  # Poprawka: dodanie importu DataFrame
+import numpy as np
 import pandas as pd
 from timefold.solver.domain import PlanningId, planning_entity, planning_solution, PlanningVariable, \
     PlanningEntityCollectionProperty, ProblemFactCollectionProperty, ValueRangeProvider, PlanningScore
-from timefold.solver.score import HardSoftScore
-from tools.df_merges import get_technician_and_device_data
+from timefold.solver.score import HardSoftScore, HardMediumSoftScore
+from settings import CAPACITY_PENALTY_LEVEL
+
+# Typ wyniku rozwiązania: poziom medium jest używany tylko dla kary za przekroczenie limitu techników
+Score = HardMediumSoftScore if CAPACITY_PENALTY_LEVEL == 'medium' else HardSoftScore
 
 
 @dataclass
@@ -36,7 +41,12 @@ class Device:
     rbh_norma: int  # Zmienione z float na int (minuty)
     dni_w_om: float
     uzytkownik: str
-    technician: Annotated[Technician | None, PlanningVariable(allows_unassigned=True)] = field(default=None)
+    # Technicy posiadający IUM urządzenia; solver proponuje tylko ich (zakres wartości zmiennej planowania)
+    eligible_technicians: Annotated[List[Technician], ValueRangeProvider(id='eligible_technicians')] = \
+        field(default_factory=list, repr=False, compare=False)
+    technician: Annotated[Technician | None,
+                          PlanningVariable(value_range_provider_refs=['eligible_technicians'],
+                                           allows_unassigned=True)] = field(default=None)
 
     def __str__(self) -> str:
         technician_str = str(self.technician) if self.technician else "None"
@@ -52,7 +62,7 @@ class DeviceSchedule:
     id: str
     technician_list: Annotated[List[Technician], ProblemFactCollectionProperty, ValueRangeProvider]
     device_list: Annotated[List[Device], PlanningEntityCollectionProperty]
-    score: Annotated[HardSoftScore, PlanningScore] = field(default=None)
+    score: Annotated[Score, PlanningScore] = field(default=None)
 
     def __str__(self):
         return (f"DeviceSchedule(id={self.id},\n"
@@ -61,20 +71,39 @@ class DeviceSchedule:
                 f"score={self.score})")
 
 
+def hours_to_minutes(hours: pd.Series) -> List[int]:
+    """
+    Konwersja całej kolumny z godzin (float) na minuty (int), z obcięciem części ułamkowej jak int().
+    Brakujące wartości zgłaszają błąd jak int(), zamiast zamieniać się po rzutowaniu w ogromne liczby ujemne.
+    """
+    values = hours.to_numpy(dtype=float)
+    missing = np.isnan(values)
+    if missing.any():
+        raise ValueError(f"Missing hours in column {hours.name} for index {hours.index[missing].tolist()}")
+    return (values * 60).astype(np.int64).tolist()
+
+
+def format_ium(ium: pd.Series) -> List[str]:
+    """
+    Konwersja całej kolumny ium na tekst uzupełniony zerami do 6 znaków, jak str(ium).zfill(6).
+    """
+    return np.char.zfill(ium.to_numpy(dtype=object).astype(str), 6).tolist()
+
+
 # Funkcja tworząca techników z dataframe
 def generate_technicians(technicians: DataFrame) -> List[Technician]:
     """
-    Generowanie techników z dataframe, dodanie logów do debugowania.
+    Generowanie techników z dataframe, kolumny są konwertowane w całości, dodanie logów do debugowania.
     """
     technician_list = [
-        Technician(
-            index,
-            row['technician'],
-            int(row['rbh_do_zaplanowania'] * 60),  # Konwersja z godzin (float) na minuty (int)
-            int(row['rbh_przydzielone'] * 60),  # Konwersja z godzin (float) na minuty (int)
-            set(row['iums'])
+        Technician(index, name, rbh_do_zaplanowania, rbh_przydzielone, set(iums))
+        for index, name, rbh_do_zaplanowania, rbh_przydzielone, iums in zip(
+            technicians.index.tolist(),
+            technicians['technician'].tolist(),
+            hours_to_minutes(technicians['rbh_do_zaplanowania']),  # Konwersja z godzin (float) na minuty (int)
+            hours_to_minutes(technicians['rbh_przydzielone']),  # Konwersja z godzin (float) na minuty (int)
+            technicians['iums'].tolist()
         )
-        for index, row in technicians.iterrows()
     ]
     for technician in technician_list:
         pass
@@ -84,20 +113,20 @@ def generate_technicians(technicians: DataFrame) -> List[Technician]:
 
 def generate_devices(devices: DataFrame) -> List[Device]:
     """
-    Generowanie urządzeń z dataframe, dodanie logów do debugowania.
+    Generowanie urządzeń z dataframe, kolumny są konwertowane w całości, dodanie logów do debugowania.
     """
     device_list = [
-        Device(
-            index,
-            str(row['ium']).zfill(6),
-            row['nazwa'],
-            row['typ'],
-            row['nr_fabryczny'],
-            int(row['rbh_norma'] * 60),  # Konwersja z godzin (float) na minuty (int)
-            row['dni_w_om'],
-            row['uzytkownik']
+        Device(index, ium, nazwa, typ, nr_fabryczny, rbh_norma, dni_w_om, uzytkownik)
+        for index, ium, nazwa, typ, nr_fabryczny, rbh_norma, dni_w_om, uzytkownik in zip(
+            devices.index.tolist(),
+            format_ium(devices['ium']),
+            devices['nazwa'].tolist(),
+            devices['typ'].tolist(),
+            devices['nr_fabryczny'].tolist(),
+            hours_to_minutes(devices['rbh_norma']),  # Konwersja z godzin (float) na minuty (int)
+            devices['dni_w_om'].tolist(),
+            devices['uzytkownik'].tolist()
         )
-        for index, row in devices.iterrows()
     ]
     for device in device_list:
         pass
@@ -105,6 +134,28 @@ def generate_devices(devices: DataFrame) -> List[Device]:
     return device_list
 
 
+def build_ium_index(technicians: List[Technician]) -> Dict[str, List[Technician]]:
+    """
+    Indeks odwrotny ium -> technicy posiadający to ium, w kolejności listy techników.
+    """
+    ium_index: Dict[str, List[Technician]] = {}
+    for technician in technicians:
+        for ium in technician.iums:
+            ium_index.setdefault(ium, []).append(technician)
+    return ium_index
+
+
+def assign_eligible_technicians(devices: List[Device], technicians: List[Technician]) -> List[Device]:
+    """
+    Ustawienie zakresu wartości każdego urządzenia na techników z wymaganym IUM.
+    Urządzenia z tym samym IUM współdzielą tę samą listę techników.
+    """
+    ium_index = build_ium_index(technicians)
+    for device in devices:
+        device.eligible_technicians = ium_index.get(device.ium, [])
+    return devices
+
+
 # Funkcja drukująca techników i urządzenia
 def print_datatables(devices: List[Device], technicians: List[Technician]):
     for device in devices:
@@ -113,13 +164,31 @@ def print_datatables(devices: List[Device], technicians: List[Technician]):
         print(technician)
 
 
-# Tworzenie list
-technicians, devices_in_bok_to_assign = get_technician_and_device_data(use_archive_data=False)
-devices_list = generate_devices(devices_in_bok_to_assign)
-technicians_list = generate_technicians(technicians)
+@lru_cache(maxsize=None)
+def load_problem_data(use_archive_data: bool = False) -> Tuple[DataFrame, DataFrame]:
+    """
+    Wczytanie danych techników i urządzeń, zapamiętywane dla kolejnych wywołań w tym samym procesie.
+    Import modułu domain nie wykonuje żadnych operacji wejścia/wyjścia, dane są ładowane dopiero tutaj.
+    """
+    from tools.df_merges import get_technician_and_device_data
+    return get_technician_and_device_data(use_archive_data=use_archive_data)
+
+
+def load_problem(use_archive_data: bool = False) -> Tuple[List[Technician], List[Device]]:
+    """
+    Tworzenie list techników i urządzeń; przy każdym wywołaniu powstają nowe obiekty, więc rozwiązania
+    solvera nie współdzielą encji, a dane źródłowe są wczytywane tylko raz.
+    Każde urządzenie dostaje listę techników z wymaganym IUM jako zakres wartości.
+    """
+    technicians, devices_in_bok_to_assign = load_problem_data(use_archive_data)
+    technicians_list = generate_technicians(technicians)
+    devices_list = assign_eligible_technicians(generate_devices(devices_in_bok_to_assign), technicians_list)
+    return technicians_list, devices_list
+
 
 # Przetwarzanie
 if __name__ == '__main__':
+    technicians_list, devices_list = load_problem(use_archive_data=False)
     print_datatables(devices_list, technicians_list)
 
     # print(f'devices_in_bok_to_assign ={devices_in_bok_to_assign }')
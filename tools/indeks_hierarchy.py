@@ -0,0 +1,92 @@
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series
+
+# Lengths of the 'indeks' code on every level of the indexy_4 hierarchy
+INDEKS_LEVELS = {
+    2: 'dziedzina',   # Domain
+    4: 'grupa',       # Group
+    6: 'podgrupa',    # Subgroup (ium)
+    8: 'nazwa',       # Instrument name
+    11: 'typ',        # Instrument type
+}
+
+
+class IndeksHierarchy:
+    """
+    Class IndeksHierarchy is built once from the indexy_4 table and maps every 'indeks' code (2, 4, 6, 8 or 11
+    characters long) to its name and norm hours. Codes are kept in a hash index that gives positions into plain
+    NumPy arrays, so enriching a whole column is one get_indexer call and an array take instead of a merge.
+    """
+
+    def __init__(self, indexy_4: DataFrame):
+        """
+        Constructor for the IndeksHierarchy class.
+
+        Params:
+        indexy_4: DataFrame with the 'indeks', 'nazwa' and 'p_norma_k' columns; for duplicated codes the first row is used.
+        """
+        codes = indexy_4['indeks'].astype(object).str.strip()
+        rows = codes.notna() & ~codes.duplicated()
+        self._codes = pd.Index(codes[rows].to_numpy(dtype=object))
+        self._names = indexy_4.loc[rows, 'nazwa'].to_numpy(dtype=object)
+        self._norms = pd.to_numeric(indexy_4.loc[rows, 'p_norma_k'], errors='coerce').to_numpy(dtype=float)
+        self._code_lengths = self._codes.str.len().to_numpy()
+
+    def level_counts(self) -> Dict[int, int]:
+        """
+        Returns the number of codes on every level of the hierarchy.
+        """
+        return {level: int(np.count_nonzero(self._code_lengths == level)) for level in INDEKS_LEVELS}
+
+    def positions(self, indeks: Series, level: Optional[int] = None) -> np.ndarray:
+        """
+        Finds the rows of indexy_4 matching the given codes.
+
+        Params:
+        indeks: Series with 'indeks' codes, e.g. from ksiazka_k.
+        level: int, the length of the prefix to look up (one of INDEKS_LEVELS), None to look up the whole code.
+
+        Returns:
+        Array of positions in the hierarchy arrays, -1 where the code is not found or shorter than the level.
+        """
+        if level is not None and level not in INDEKS_LEVELS:
+            raise ValueError(f"Unknown indeks level {level}, expected one of {list(INDEKS_LEVELS)}")
+        codes = indeks.astype(object).str.strip()
+        if level is not None:
+            codes = codes.where(codes.str.len() >= level).str[:level]
+        return self._codes.get_indexer(codes)
+
+    @staticmethod
+    def _take(values: np.ndarray, positions: np.ndarray, missing) -> np.ndarray:
+        result = np.full(len(positions), missing, dtype=values.dtype)
+        found = positions >= 0
+        result[found] = values[positions[found]]
+        return result
+
+    def names(self, indeks: Series, level: Optional[int] = None) -> np.ndarray:
+        """
+        Returns the names of the given codes (or of their prefixes of the given level), None where not found.
+        """
+        return self._take(self._names, self.positions(indeks, level), None)
+
+    def norms(self, indeks: Series, level: Optional[int] = None) -> np.ndarray:
+        """
+        Returns the norm hours (p_norma_k) of the given codes (or of their prefixes of the given level), NaN where not found.
+        """
+        return self._take(self._norms, self.positions(indeks, level), np.nan)
+
+    def name_of(self, code: str) -> Optional[str]:
+        """
+        Returns the name of a single code, None if it is not in indexy_4.
+        """
+        position = self._codes.get_indexer([code.strip()])[0]
+        return self._names[position] if position >= 0 else None
+
+    def norm_of(self, code: str) -> float:
+        """
+        Returns the norm hours of a single code, NaN if it is not in indexy_4.
+        """
+        position = self._codes.get_indexer([code.strip()])[0]
+        return self._norms[position] if position >= 0 else np.nan
@@ -0,0 +1,240 @@
+"""
+Small lazy query layer over DataLoader tables.
+
+A LazyFrame only records the scans, filters, joins and column selections. collect() first rewrites the plan:
+filters are pushed below joins down to the scans (where DataLoader.load evaluates them while reading the table)
+and every scan reads only the columns used by the rest of the plan. Only the final frame is materialized.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, replace
+import pandas as pd
+from pandas import DataFrame
+from tools.DBF_Reader_ODBC import get_filter_mask
+from tools.ODBCDataLoader import DataLoader, TableQuery
+
+Condition = Tuple[str, str, Any]
+
+# Operators for which a missing value never passes the filter, so the filter may be applied below a left join
+# on its right side, turning the join into an inner join
+NULL_REJECTING_OPERATORS = ('==', 'in', 'notnull')
+
+
+@dataclass(frozen=True)
+class _Scan:
+    key: str
+    columns: Optional[Tuple[str, ...]] = None
+    filters: Tuple[Condition, ...] = ()
+
+
+@dataclass(frozen=True)
+class _Filter:
+    input: Any
+    conditions: Tuple[Condition, ...]
+
+
+@dataclass(frozen=True)
+class _Project:
+    input: Any
+    columns: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class _Join:
+    left: Any
+    right: Any
+    left_on: Tuple[str, ...]
+    right_on: Tuple[str, ...]
+    how: str
+    suffixes: Tuple[str, str]
+
+
+class LazyFrame:
+    """
+    Class LazyFrame describes a query over the tables of a DataLoader. The methods return new LazyFrame objects,
+    the data is read only by collect().
+    """
+
+    def __init__(self, loader: DataLoader, node):
+        self.loader = loader
+        self.node = node
+
+    @classmethod
+    def scan(cls, loader: DataLoader, key: str, columns: Optional[Sequence[str]] = None) -> 'LazyFrame':
+        """
+        Starts a query from a table of the DataLoader.
+
+        Params:
+        loader: DataLoader, the loader providing the table.
+        key: str, the key of the table in DBF_PATHS.
+        columns: list of columns available to the query, all columns of the table if None.
+        """
+        return cls(loader, _Scan(key, tuple(columns) if columns is not None else None))
+
+    def filter(self, *conditions: Condition) -> 'LazyFrame':
+        """
+        Keeps the rows matching all (column, operator, value) conditions, see get_filter_mask for the operators.
+        """
+        return LazyFrame(self.loader, _Filter(self.node, tuple(conditions)))
+
+    def select(self, columns: Sequence[str]) -> 'LazyFrame':
+        """
+        Keeps only the given columns, in the given order.
+        """
+        return LazyFrame(self.loader, _Project(self.node, tuple(columns)))
+
+    def join(self, other: 'LazyFrame', on=None, left_on=None, right_on=None, how: str = 'left',
+             suffixes: Tuple[str, str] = ('_x', '_y')) -> 'LazyFrame':
+        """
+        Joins another query like pd.merge. Both queries must use the same DataLoader.
+        """
+        if on is not None:
+            left_on = right_on = on
+        left_on = (left_on,) if isinstance(left_on, str) else tuple(left_on)
+        right_on = (right_on,) if isinstance(right_on, str) else tuple(right_on)
+        if len(left_on) != len(right_on):
+            raise ValueError("left_on and right_on must have the same number of columns")
+        return LazyFrame(self.loader, _Join(self.node, other.node, left_on, right_on, how, tuple(suffixes)))
+
+    def schema(self) -> List[str]:
+        """
+        Returns the columns of the query result.
+        """
+        return list(self._output_sources(self.node))
+
+    def _output_sources(self, node) -> Dict[str, List[Tuple[str, str]]]:
+        """
+        Maps every output column of the node to the (side, column) pairs it comes from; side is 'left' or 'right'
+        for joins and '' otherwise. Join keys with the same name on both sides come from both sides.
+        """
+        if isinstance(node, _Scan):
+            columns = node.columns if node.columns is not None else self.loader.table_columns(node.key)
+            return {column: [('', column)] for column in columns}
+        if isinstance(node, _Filter):
+            return {column: [('', column)] for column in self._output_sources(node.input)}
+        if isinstance(node, _Project):
+            return {column: [('', column)] for column in node.columns}
+
+        left_columns, right_columns = list(self._output_sources(node.left)), list(self._output_sources(node.right))
+        shared_keys = {left for left, right in zip(node.left_on, node.right_on) if left == right}
+        overlapping = (set(left_columns) & set(right_columns)) - shared_keys
+        sources: Dict[str, List[Tuple[str, str]]] = {}
+        for column in left_columns:
+            name = column + node.suffixes[0] if column in overlapping else column
+            sources[name] = [('left', column)] + ([('right', column)] if column in shared_keys else [])
+        for column in right_columns:
+            if column in shared_keys:
+                continue
+            sources[column + node.suffixes[1] if column in overlapping else column] = [('right', column)]
+        return sources
+
+    def _plan(self, node, required: Optional[set], conditions: Tuple[Condition, ...]):
+        """
+        Rewrites the node so that it applies the conditions and produces at least the required columns
+        (all columns if None), pushing the conditions and the column list down to the scans where possible.
+        Scans do not need the columns of their own filters, DataLoader.load evaluates them while reading.
+        """
+        if isinstance(node, _Scan):
+            columns = node.columns
+            if required is not None:
+                available = node.columns if node.columns is not None else self.loader.table_columns(node.key)
+                columns = tuple(column for column in available if column in required)
+            return replace(node, columns=columns, filters=node.filters + conditions)
+
+        if isinstance(node, _Filter):
+            return self._plan(node.input, required, node.conditions + conditions)
+
+        if isinstance(node, _Project):
+            columns = tuple(column for column in node.columns if required is None or column in required)
+            return _Project(self._plan(node.input, set(columns), conditions), columns)
+
+        sources = self._output_sources(node)
+        how = node.how
+        pushed = {'left': [], 'right': []}
+        residual = []
+        for condition in conditions:
+            sides = dict(sources.get(condition[0], []))
+            targets = []
+            if how in ('left', 'inner'):
+                targets = [side for side in sides if side == 'left' or how == 'inner' or 'left' in sides]
+                if not targets and 'right' in sides and condition[1] in NULL_REJECTING_OPERATORS:
+                    targets, how = ['right'], 'inner'
+            if not targets:
+                residual.append(condition)
+            for side in targets:
+                pushed[side].append((sides[side], condition[1], condition[2]))
+
+        needed = {column for column, _, _ in residual}
+        needed |= set(sources) if required is None else set(required)
+        side_required = {'left': set(node.left_on), 'right': set(node.right_on)}
+        for column in needed:
+            for side, source in sources.get(column, []):
+                side_required[side].add(source)
+        join = replace(node, how=how,
+                       left=self._plan(node.left, side_required['left'], tuple(pushed['left'])),
+                       right=self._plan(node.right, side_required['right'], tuple(pushed['right'])))
+        return _Filter(join, tuple(residual)) if residual else join
+
+    def _optimized(self):
+        return self._plan(self.node, None, ())
+
+    def _scans(self, node) -> List[_Scan]:
+        if isinstance(node, _Scan):
+            return [node]
+        if isinstance(node, _Join):
+            return self._scans(node.left) + self._scans(node.right)
+        return self._scans(node.input)
+
+    def table_queries(self) -> List[TableQuery]:
+        """
+        Returns the table reads of the optimized plan, e.g. to load them in advance with DataLoader.prefetch.
+        """
+        return [TableQuery(scan.key, scan.columns, scan.filters) for scan in self._scans(self._optimized())]
+
+    def prefetch(self, *tables: str):
+        """
+        Loads the tables used by the query, and the given additional tables, concurrently.
+        With the ODBC backend whole tables are loaded first, since the columns of a table are known only after loading it.
+        """
+        if self.loader.backend == 'native':
+            requests = self.table_queries()
+        else:
+            requests = [scan.key for scan in self._scans(self.node)]
+        return self.loader.prefetch(list(tables) + requests)
+
+    def explain(self) -> str:
+        """
+        Returns the optimized plan as text.
+        """
+        def describe(node, depth: int) -> List[str]:
+            indent = '  ' * depth
+            if isinstance(node, _Scan):
+                return [f"{indent}Scan {node.key} columns={list(node.columns) if node.columns else 'all'} "
+                        f"filters={list(node.filters)}"]
+            if isinstance(node, _Join):
+                return ([f"{indent}Join how={node.how} left_on={list(node.left_on)} right_on={list(node.right_on)}"]
+                        + describe(node.left, depth + 1) + describe(node.right, depth + 1))
+            if isinstance(node, _Filter):
+                return [f"{indent}Filter {list(node.conditions)}"] + describe(node.input, depth + 1)
+            return [f"{indent}Select {list(node.columns)}"] + describe(node.input, depth + 1)
+
+        return '\n'.join(describe(self._optimized(), 0))
+
+    def _execute(self, node) -> DataFrame:
+        if isinstance(node, _Scan):
+            return self.loader.load(node.key, list(node.columns) if node.columns is not None else None,
+                                    list(node.filters))
+        if isinstance(node, _Filter):
+            df = self._execute(node.input)
+            return df[get_filter_mask(df, list(node.conditions))]
+        if isinstance(node, _Project):
+            return self._execute(node.input)[list(node.columns)]
+        return pd.merge(self._execute(node.left), self._execute(node.right), how=node.how,
+                        left_on=list(node.left_on), right_on=list(node.right_on), suffixes=node.suffixes)
+
+    def collect(self) -> DataFrame:
+        """
+        Optimizes the plan, reads the tables and returns the result as a new DataFrame.
+        """
+        plan = self._optimized()
+        df = self._execute(plan)
+        return df.copy() if isinstance(plan, _Scan) else df
@@ -1,10 +1,18 @@
+from typing import Optional, Tuple
+import os
 import pandas as pd
-from timefold.solver.config import SolverConfig, ScoreDirectorFactoryConfig, TerminationConfig, Duration
+from timefold.solver.config import MoveThreadCount, RequiresEnterpriseError
 from timefold.solver import SolverFactory
-from constraints import define_constraints
-from domain import DeviceSchedule, Device, generate_devices, generate_technicians
-from tools.df_merges import get_technician_and_device_data
-from timefold.solver.score import HardSoftScore
+import constraints
+from domain import DeviceSchedule, load_problem
+from constraint_profiler import ConstraintProfiler
+from solver_config import create_solver_config
+from decomposition import solve_decomposed
+from termination import TerminationPolicy, ScoreTimeline, format_score
+from settings import SOLVER_RUN_MODE, SOLVER_THREAD_COUNT, SOLVER_RUNS_DIRECTORY, PROFILE_CONSTRAINTS, \
+    CONSTRAINT_PROFILE_FORMAT, SCORE_DIRECTOR
+
+RUN_MODES = ('single', 'multithreaded', 'partitioned')
 
 def generate_problem(technicians_list, devices_list):
     #return DeviceSchedule("schedule1", [technicians_list[2], technicians_list[24],technicians_list[23]], devices_list)
@@ -96,38 +104,90 @@ def on_best_solution_change(event):
     print(f"\nNew Best Solution Found! Score: {best_solution.score}")
     print(f"Hard score: {-best_solution.score.hard_score}, Soft score: {best_solution.score.soft_score}")
 
+def build_solver(thread_count: int, policy: TerminationPolicy, profiler: Optional[ConstraintProfiler] = None):
+    """
+    Buduje solver z warunkami zakończenia policy. Dla thread_count > 1 włącza wielowątkowe ocenianie ruchów,
+    a jeśli timefold-enterprise nie jest zainstalowany, wraca do jednego wątku.
+    Jeśli podano profiler, ograniczenia są budowane przez niego.
+    Zwraca solver i faktycznie użytą liczbę wątków.
+    """
+    termination_config = policy.to_config()
+    constraint_provider_function = profiler.constraint_provider(constraints) if profiler else constraints.define_constraints
+    if thread_count > 1:
+        try:
+            return SolverFactory.create(create_solver_config(termination_config, thread_count,
+                                                             constraint_provider_function)).build_solver(), thread_count
+        except RequiresEnterpriseError as error:
+            print(f"Multithreaded solving is not available ({error}), falling back to a single thread.")
+    return SolverFactory.create(create_solver_config(termination_config, MoveThreadCount.NONE,
+                                                     constraint_provider_function)).build_solver(), 1
+
+def solve(technicians_list, devices_list, mode: str = SOLVER_RUN_MODE, thread_count: int = SOLVER_THREAD_COUNT,
+          policy: Optional[TerminationPolicy] = None) -> Tuple[DeviceSchedule, ScoreTimeline]:
+    """
+    Rozwiązuje problem w wybranym trybie:
+    - 'single': jeden solver, jeden wątek,
+    - 'multithreaded': jeden solver z thread_count wątkami oceniającymi ruchy,
+    - 'partitioned': składowe połączone wspólnymi IUM rozwiązywane równolegle w thread_count procesach.
+    policy określa warunki zakończenia trybów 'single' i 'multithreaded' (domyślnie z settings).
+    Przy PROFILE_CONSTRAINTS tryby 'single' i 'multithreaded' wypisują też koszt funkcji każdego ograniczenia.
+    Zwraca rozwiązanie i czasy znalezienia kolejnych najlepszych wyników.
+    """
+    if mode not in RUN_MODES:
+        raise ValueError(f"Unknown run mode {mode}, expected one of {RUN_MODES}")
+    if mode == 'partitioned':
+        if PROFILE_CONSTRAINTS:
+            print("Constraint profiling is not available in mode 'partitioned', components are solved in other processes.")
+        timeline = ScoreTimeline()
+        solution = solve_decomposed(technicians_list, devices_list, max_workers=thread_count)
+        timeline.record(solution.score)
+        return solution, timeline
+
+    policy = policy or TerminationPolicy()
+    # Profiler mierzy funkcje ograniczeń, więc nie jest używany z przyrostowym kalkulatorem wyniku
+    profiler = ConstraintProfiler() if PROFILE_CONSTRAINTS and SCORE_DIRECTOR == 'constraint_streams' else None
+    solver, used_threads = build_solver(thread_count if mode == 'multithreaded' else 1, policy, profiler)
+    print(f"Solving in mode '{mode}' with {used_threads} thread(s).")
+    timeline = ScoreTimeline()
+
+    def on_best_solution(event):
+        timeline.record(event.new_best_solution.score)
+        on_best_solution_change(event)
+
+    solver.add_event_listener(on_best_solution)
+    solution = solver.solve(generate_problem(technicians_list, devices_list))
+    print(f"\nSolver stopped after {timeline.elapsed() / 60:.1f} min: {policy.stop_reason(timeline, solver.is_terminate_early())}.")
+    if profiler:
+        print(profiler.report(CONSTRAINT_PROFILE_FORMAT))
+    return solution, timeline
+
+def report_speed_up(mode: str, timeline: ScoreTimeline):
+    """
+    Porównuje uruchomienie z ostatnim zapisanym uruchomieniem w trybie 'single': dla gorszego z obu końcowych wyników
+    podaje czas jego osiągnięcia w obu uruchomieniach i przyspieszenie.
+    Linia czasu każdego uruchomienia jest zapisywana w SOLVER_RUNS_DIRECTORY.
+    """
+    timeline.save(os.path.join(SOLVER_RUNS_DIRECTORY, f"{mode}.json"))
+    baseline = ScoreTimeline.load(os.path.join(SOLVER_RUNS_DIRECTORY, 'single.json'))
+    if mode == 'single' or baseline is None or not baseline.points or not timeline.points:
+        print(f"\nNo single-thread baseline to compare the '{mode}' run with; "
+              f"run once with SOLVER_RUN_MODE = 'single' to record it.")
+        return
+    if len(baseline.final_score()) != len(timeline.final_score()):
+        print(f"\nThe single-thread baseline was recorded with another score type; run it again to compare.")
+        return
+    target = min(baseline.final_score(), timeline.final_score())
+    baseline_seconds, seconds = baseline.time_to_reach(target), timeline.time_to_reach(target)
+    print(f"\nScore {format_score(target)} reached in {seconds:.1f} s in mode '{mode}' "
+          f"and in {baseline_seconds:.1f} s in mode 'single': speed-up {baseline_seconds / max(seconds, 1e-9):.1f}x.")
+
 if __name__ == '__main__':
     # Pobierz dane techników i urządzeń
-    technicians, devices_in_bok_to_assign = get_technician_and_device_data(use_archive_data=True)
-    technicians_list = generate_technicians(technicians)
-    devices_list = generate_devices(devices_in_bok_to_assign)
-
-    # Konfiguracja solvera
-    solver_factory = SolverFactory.create(
-        SolverConfig(
-            solution_class=DeviceSchedule,
-            entity_class_list=[Device],
-            score_director_factory_config=ScoreDirectorFactoryConfig(
-                constraint_provider_function=define_constraints  # Włączanie ograniczeń
-            ),
-            termination_config=TerminationConfig(
-                #best_score_limit="0hard/978soft",  # Solver będzie dążył do osiągnięcia wyższej jakości rozwiązania.
-                spent_limit=Duration(minutes=4*60)
-            )
-        )
-    )
-
-
-    solver = solver_factory.build_solver()
-
-    # Dodanie nasłuchiwacza najlepszego rozwiązania
-    solver.add_event_listener(on_best_solution_change)
-
-    # Generowanie instancji problemu
-    problem = generate_problem(technicians_list, devices_list)
-
-    # Rozwiązanie problemu
-    solution = solver.solve(problem)
+    technicians_list, devices_list = load_problem(use_archive_data=True)
+
+    # Rozwiązanie problemu w trybie SOLVER_RUN_MODE i porównanie z uruchomieniem jednowątkowym
+    solution, timeline = solve(technicians_list, devices_list)
+    report_speed_up(SOLVER_RUN_MODE, timeline)
 
     # Wyświetlenie rozwiązania i zapis do Excela
     print_solution(solution, extended=False, save_to_excel=True, excel_file="device_schedule.xlsx")
@@ -0,0 +1,180 @@
+"""
+Versioned binary snapshot of the prepared planning problem (technicians and devices to assign).
+
+The snapshot is a single uncompressed .npz file without pickled objects:
+    meta                      JSON (UTF-8 bytes): schema version, source fingerprint and the column schemas
+    <frame>/index             row labels of the frame
+    <frame>/<column>/...      arrays of every column, depending on its kind:
+        int, float, bool      values
+        datetime              int64 values of the datetime64 unit stored in the schema
+        str                   int32 dictionary codes (-1 = missing), dictionary offsets and UTF-8 dictionary data
+        list                  CSR layout of lists of strings: int64 row offsets and the flattened values as str
+"""
+from typing import Dict, Optional, Tuple
+from datetime import datetime
+import json
+import os
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from tools.settings import DBF_PATHS, INDEX_PRACOWNI, EXCLUDED_WORDS_LIST
+from tools.table_cache import SourceFingerprint
+
+SNAPSHOT_SCHEMA_VERSION = 1
+PROBLEM_SOURCE_TABLES = ['ksiazka_k', 'bok', 'indexy_4', 'ind4_om', 'pers_gr', 'pers_st']
+FRAMES = ('technicians', 'devices')
+
+
+def problem_source_fingerprint() -> dict:
+    """
+    Fingerprint of everything the prepared problem is derived from: the source DBF files and the settings
+    selecting the laboratory and the excluded devices. Tables that cannot be read have a None fingerprint.
+    """
+    tables = {}
+    for key in PROBLEM_SOURCE_TABLES:
+        try:
+            fingerprint = SourceFingerprint.of(DBF_PATHS[key])
+            tables[key] = [fingerprint.mtime_ns, fingerprint.size, fingerprint.record_count]
+        except (OSError, ValueError):
+            tables[key] = None
+    return {'tables': tables, 'index_pracowni': INDEX_PRACOWNI, 'excluded_words': sorted(set(EXCLUDED_WORDS_LIST))}
+
+
+def _encode_strings(values: np.ndarray, prefix: str, arrays: Dict[str, np.ndarray]):
+    codes, dictionary = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+    encoded = [str(text).encode('utf-8') for text in dictionary]
+    arrays[f"{prefix}/codes"] = codes.astype(np.int32)
+    arrays[f"{prefix}/offsets"] = np.cumsum([0] + [len(text) for text in encoded], dtype=np.int64)
+    arrays[f"{prefix}/data"] = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+
+def _decode_strings(prefix: str, arrays) -> np.ndarray:
+    offsets, data = arrays[f"{prefix}/offsets"], arrays[f"{prefix}/data"].tobytes()
+    dictionary = np.array([data[start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:])] + [None],
+                          dtype=object)
+    return dictionary[arrays[f"{prefix}/codes"]]  # code -1 takes the trailing None
+
+
+def _column_kind(series: pd.Series) -> str:
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return 'str'
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return 'bool'
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return 'int'
+    if pd.api.types.is_float_dtype(series.dtype):
+        return 'float'
+    if pd.api.types.is_datetime64_dtype(series.dtype):
+        return 'datetime'
+    values = series.dropna()
+    if len(values) and all(isinstance(value, (list, tuple)) for value in values):
+        return 'list'
+    if all(isinstance(value, str) for value in values):
+        return 'str'
+    raise TypeError(f"Column {series.name} of type {series.dtype} cannot be stored in the snapshot")
+
+
+def _encode_frame(name: str, df: DataFrame, arrays: Dict[str, np.ndarray]) -> list:
+    if not pd.api.types.is_integer_dtype(df.index.dtype):
+        raise TypeError(f"Frame {name} must have an integer index to be stored in the snapshot")
+    arrays[f"{name}/index"] = df.index.to_numpy(dtype=np.int64)
+    schema = []
+    for position, column in enumerate(df.columns):
+        series = df[column]
+        kind = _column_kind(series)
+        prefix = f"{name}/{position}"
+        if kind == 'str':
+            _encode_strings(series.astype(object).to_numpy(), prefix, arrays)
+        elif kind == 'list':
+            lists = [list(value) if isinstance(value, (list, tuple)) else [] for value in series]
+            arrays[f"{prefix}/offsets"] = np.cumsum([0] + [len(values) for values in lists], dtype=np.int64)
+            _encode_strings(np.array([value for values in lists for value in values], dtype=object),
+                            f"{prefix}/values", arrays)
+        elif kind == 'datetime':
+            arrays[f"{prefix}/values"] = series.to_numpy().view(np.int64)
+        else:
+            arrays[f"{prefix}/values"] = series.to_numpy()
+        schema.append({'name': column, 'kind': kind, 'dtype': str(series.dtype)})
+    return schema
+
+
+def _decode_frame(name: str, schema: list, arrays) -> DataFrame:
+    columns = {}
+    for position, column in enumerate(schema):
+        prefix = f"{name}/{position}"
+        if column['kind'] == 'str':
+            values = pd.Series(_decode_strings(prefix, arrays), dtype=object)
+            columns[column['name']] = values if column['dtype'] == 'object' else values.astype(column['dtype'])
+        elif column['kind'] == 'list':
+            offsets = arrays[f"{prefix}/offsets"]
+            flat = _decode_strings(f"{prefix}/values", arrays)
+            columns[column['name']] = pd.Series([list(flat[start:end]) for start, end in zip(offsets[:-1], offsets[1:])],
+                                                dtype=object)
+        elif column['kind'] == 'datetime':
+            columns[column['name']] = pd.Series(arrays[f"{prefix}/values"].view(column['dtype']))
+        else:
+            columns[column['name']] = pd.Series(arrays[f"{prefix}/values"], dtype=column['dtype'])
+    df = DataFrame(columns)
+    df.index = pd.Index(arrays[f"{name}/index"])
+    return df
+
+
+def save_problem_snapshot(path: str, technicians: DataFrame, devices: DataFrame, fingerprint: Optional[dict] = None):
+    """
+    Saves technicians and devices to a snapshot file. The file is written to a temporary path and then renamed.
+
+    Params:
+    path: str, the path of the snapshot file.
+    technicians: DataFrame, technicians with the 'iums' list column.
+    devices: DataFrame, devices in BOK to assign.
+    fingerprint: dict, the source fingerprint, problem_source_fingerprint() if None.
+    """
+    arrays: Dict[str, np.ndarray] = {}
+    meta = {
+        'schema_version': SNAPSHOT_SCHEMA_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'fingerprint': fingerprint if fingerprint is not None else problem_source_fingerprint(),
+        'frames': {'technicians': _encode_frame('technicians', technicians, arrays),
+                   'devices': _encode_frame('devices', devices, arrays)},
+    }
+    arrays['meta'] = np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(f"{path}.part", 'wb') as file:
+        np.savez(file, **arrays)
+    os.replace(f"{path}.part", path)
+
+
+def load_problem_snapshot(path: str, fingerprint: Optional[dict] = None) -> Optional[Tuple[DataFrame, DataFrame]]:
+    """
+    Loads technicians and devices from a snapshot file if it matches the current schema version and sources.
+
+    Params:
+    path: str, the path of the snapshot file.
+    fingerprint: dict, the current source fingerprint, problem_source_fingerprint() if None.
+
+    Returns:
+    Tuple (technicians, devices), or None if the file is missing, of another schema version or stale.
+    Tables that cannot be read now (e.g. the Logis directory is not available) are not compared.
+    """
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as arrays:
+        meta = json.loads(arrays['meta'].tobytes().decode('utf-8'))
+        if meta.get('schema_version') != SNAPSHOT_SCHEMA_VERSION:
+            print(f"Snapshot {path} has schema version {meta.get('schema_version')}, "
+                  f"expected {SNAPSHOT_SCHEMA_VERSION}; rebuilding the problem.")
+            return None
+
+        current = fingerprint if fingerprint is not None else problem_source_fingerprint()
+        stored = meta['fingerprint']
+        changed = [key for key, value in current['tables'].items()
+                   if value is not None and stored['tables'].get(key) != value]
+        if changed or {key: value for key, value in current.items() if key != 'tables'} != \
+                {key: value for key, value in stored.items() if key != 'tables'}:
+            print(f"Snapshot {path} from {meta['created']} is stale (changed: {changed or 'settings'}); "
+                  f"rebuilding the problem.")
+            return None
+        if any(value is None for value in current['tables'].values()):
+            print(f"Some source tables are not available, using snapshot {path} from {meta['created']} unchecked.")
+
+        return tuple(_decode_frame(name, meta['frames'][name], arrays) for name in FRAMES)
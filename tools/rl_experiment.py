@@ -33,14 +33,20 @@ class Device:
 
 
 def generate_technicians(technicians: pd.DataFrame) -> List[Technician]:
-    technician_list = [Technician(index, row['technician'], row['rbh_do_zaplanowania'], row['rbh_przydzielone'], set(row['iums']))
-                       for index, row in technicians.iterrows()]
+    technician_list = [Technician(index, name, rbh_do_zaplanowania, rbh_przydzielone, set(iums))
+                       for index, name, rbh_do_zaplanowania, rbh_przydzielone, iums in zip(
+                           technicians.index.tolist(), technicians['technician'].tolist(),
+                           technicians['rbh_do_zaplanowania'].tolist(), technicians['rbh_przydzielone'].tolist(),
+                           technicians['iums'].tolist())]
     return technician_list
 
 
 def generate_devices(devices: pd.DataFrame) -> List[Device]:
-    device_list = [Device(index, str(row['ium']).zfill(6), row['nazwa'], row['typ'], row['nr_fabryczny'], row['rbh_norma'], row['dni_w_om'], row['uzytkownik'])
-                   for index, row in devices.iterrows()]
+    iums = np.char.zfill(devices['ium'].to_numpy(dtype=object).astype(str), 6).tolist()
+    device_list = [Device(*values)
+                   for values in zip(devices.index.tolist(), iums, devices['nazwa'].tolist(), devices['typ'].tolist(),
+                                     devices['nr_fabryczny'].tolist(), devices['rbh_norma'].tolist(),
+                                     devices['dni_w_om'].tolist(), devices['uzytkownik'].tolist())]
     return device_list
 
 
@@ -0,0 +1,13 @@
+from timefold.solver.score import IncrementalScoreCalculator
+from domain import Score
+from scoring import DeviceScheduleScoreState
+
+
+class DeviceScheduleIncrementalScoreCalculator(DeviceScheduleScoreState, IncrementalScoreCalculator):
+    """
+    Przyrostowy kalkulator wyniku dla Timefold (SCORE_DIRECTOR = 'incremental'); stan i zmiany wyniku
+    są liczone przez DeviceScheduleScoreState w scoring.py.
+    """
+
+    def calculate_score(self):
+        return Score.of(*self.score_levels())
@@ -0,0 +1,140 @@
+"""
+Sprawdzenie zgodności przyrostowego wyniku z wynikiem liczonym od zera.
+
+Na zarchiwizowanym problemie (migawka z load_problem(use_archive_data=True)) wykonywana jest powtarzalna (seed)
+sekwencja losowych ruchów: zmiana technika urządzenia (na uprawnionego technika lub brak) i zamiana techników
+dwóch urządzeń. Po każdym ruchu wynik DeviceScheduleIncrementalScoreCalculator jest porównywany z pełnym
+przeliczeniem w NumPy (obciążenie i przekroczenie limitu, nagrody za przypisanie i dni_w_om).
+Opcjonalnie co kilka ruchów porównywany jest też wynik ograniczeń define_constraints (SolutionManager.update).
+Raportowana jest pierwsza rozbieżność.
+
+Uruchomienie z katalogu tools: python score_crosscheck.py --moves 100000 --seed 0 [--constraint-streams 1000]
+"""
+from typing import List, Optional, Tuple
+from dataclasses import dataclass
+import argparse
+import random
+import numpy as np
+from domain import Device, DeviceSchedule, Technician, load_problem
+from score_calculator import DeviceScheduleIncrementalScoreCalculator
+from termination import score_levels, format_score
+from settings import CAPACITY_PENALTY_SHAPE, CAPACITY_PENALTY_LEVEL, CAPACITY_PENALTY_SQUARED_MAX
+
+
+@dataclass
+class Divergence:
+    step: int
+    move: str
+    incremental: Tuple[int, ...]
+    expected: Tuple[int, ...]
+    source: str  # 'numpy' lub 'constraint_streams'
+
+    def __str__(self):
+        return (f"First divergence after move {self.step} ({self.move}): incremental {format_score(self.incremental)}, "
+                f"{self.source} {format_score(self.expected)}")
+
+
+def recalculate_score(technicians: List[Technician], devices: List[Device]) -> Tuple[int, ...]:
+    """
+    Pełne przeliczenie wyniku w NumPy, niezależne od kalkulatora przyrostowego, w tej samej postaci co jego score_levels.
+    """
+    positions = {technician.id: position for position, technician in enumerate(technicians)}
+    assigned = [device for device in devices if device.technician is not None]
+    owners = np.array([positions[device.technician.id] for device in assigned], dtype=np.int64)
+    norms = np.array([device.rbh_norma for device in assigned], dtype=np.int64)
+    dni_w_om = np.array([device.dni_w_om for device in assigned], dtype=float)
+    capacities = np.array([technician.rbh_do_zaplanowania for technician in technicians], dtype=np.int64)
+
+    loads = np.bincount(owners, weights=norms, minlength=len(technicians)).astype(np.int64)
+    overloads = np.maximum(loads - capacities, 0)
+    if CAPACITY_PENALTY_SHAPE == 'count':
+        capacity_penalty = int(np.count_nonzero(overloads))
+    elif CAPACITY_PENALTY_SHAPE == 'squared':
+        capacity_penalty = int(np.minimum(-(-overloads ** 2 // 60), CAPACITY_PENALTY_SQUARED_MAX).sum())
+    else:
+        capacity_penalty = int(overloads.sum())
+
+    min_dni_w_om = np.full(len(technicians), np.inf)
+    np.minimum.at(min_dni_w_om, owners, dni_w_om)
+    soft_score = int(len(assigned) + min_dni_w_om[np.isfinite(min_dni_w_om)].sum())
+    if CAPACITY_PENALTY_LEVEL == 'medium':
+        return -int(np.count_nonzero(overloads)), -capacity_penalty, soft_score
+    return -capacity_penalty, soft_score
+
+
+def _set_technician(calculator: DeviceScheduleIncrementalScoreCalculator, device: Device, technician):
+    calculator.before_variable_changed(device, 'technician')
+    device.technician = technician
+    calculator.after_variable_changed(device, 'technician')
+
+
+def random_move(rng: random.Random, devices: List[Device],
+                calculator: DeviceScheduleIncrementalScoreCalculator) -> str:
+    """
+    Wykonuje losowy ruch w zakresie wartości urządzeń i zwraca jego opis.
+    """
+    device = rng.choice(devices)
+    other = rng.choice(devices)
+    if rng.random() < 0.5 and other is not device and other.technician in device.eligible_technicians + [None] \
+            and device.technician in other.eligible_technicians + [None]:
+        first, second = device.technician, other.technician
+        _set_technician(calculator, device, second)
+        _set_technician(calculator, other, first)
+        return f"swap devices {device.index} and {other.index}"
+    technician = rng.choice(device.eligible_technicians + [None])
+    _set_technician(calculator, device, technician)
+    return f"device {device.index} -> technician {technician.id if technician is not None else None}"
+
+
+def crosscheck(moves: int, seed: int, constraint_streams_every: Optional[int] = None) -> Optional[Divergence]:
+    """
+    Wykonuje moves losowych ruchów i zwraca pierwszą rozbieżność albo None.
+
+    Params:
+    moves: int, liczba ruchów.
+    seed: int, ziarno generatora ruchów.
+    constraint_streams_every: int, co ile ruchów porównać także wynik define_constraints (None = wcale).
+    """
+    technicians, devices = load_problem(use_archive_data=True)
+    solution = DeviceSchedule("crosscheck", technicians, devices)
+    rng = random.Random(seed)
+    for device in devices:
+        device.technician = rng.choice(device.eligible_technicians + [None])
+
+    solution_manager = None
+    if constraint_streams_every:
+        from timefold.solver import SolverFactory, SolutionManager
+        from timefold.solver.config import TerminationConfig
+        from constraints import define_constraints
+        from solver_config import create_solver_config
+        # Porównanie zawsze z ograniczeniami, także przy SCORE_DIRECTOR = 'incremental'
+        solver_config = create_solver_config(TerminationConfig(), constraint_provider_function=define_constraints,
+                                             score_director='constraint_streams')
+        solution_manager = SolutionManager.create(SolverFactory.create(solver_config))
+
+    calculator = DeviceScheduleIncrementalScoreCalculator()
+    calculator.reset_working_solution(solution)
+    move = "initial assignment"
+    for step in range(moves + 1):
+        if step:
+            move = random_move(rng, devices, calculator)
+        incremental = calculator.score_levels()
+        expected = recalculate_score(technicians, devices)
+        if incremental != expected:
+            return Divergence(step, move, incremental, expected, 'numpy')
+        if solution_manager is not None and step % constraint_streams_every == 0:
+            expected = score_levels(solution_manager.update(solution))
+            if incremental != expected:
+                return Divergence(step, move, incremental, expected, 'constraint_streams')
+    return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the incremental score with a full recalculation.")
+    parser.add_argument('--moves', type=int, default=10000, help="number of random moves")
+    parser.add_argument('--seed', type=int, default=0, help="random seed of the moves")
+    parser.add_argument('--constraint-streams', type=int, default=None, metavar='EVERY',
+                        help="also compare with define_constraints every EVERY moves")
+    args = parser.parse_args()
+    divergence = crosscheck(args.moves, args.seed, args.constraint_streams)
+    print(divergence if divergence else f"No divergence in {args.moves} moves (seed {args.seed}).")
@@ -0,0 +1,155 @@
+"""
+Wynik rozwiązania liczony w Pythonie, bez Timefold: kara za przekroczenie limitu technika, pełne przeliczenie
+wyniku (calculate_score) i stan przyrostowego kalkulatora (DeviceScheduleScoreState).
+Moduł nie importuje timefold ani domain, więc można go używać i testować bez JVM.
+"""
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple
+from collections import Counter
+import heapq
+import numpy as np
+from settings import CAPACITY_PENALTY_SHAPE, CAPACITY_PENALTY_LEVEL, CAPACITY_PENALTY_SQUARED_MAX
+
+if TYPE_CHECKING:
+    from domain import Device, DeviceSchedule
+
+
+def capacity_penalty(overload: int) -> int:
+    """
+    Kara za przekroczenie limitu technika o overload minut, zależnie od CAPACITY_PENALTY_SHAPE.
+    Kwadrat przekroczenia w minutach przekroczyłby zakres wyniku int już przy kilkuset godzinach,
+    dlatego kara 'squared' to minuty razy godziny (zaokrąglone w górę) ograniczone przez CAPACITY_PENALTY_SQUARED_MAX.
+    """
+    if CAPACITY_PENALTY_SHAPE == 'count':
+        return 1
+    if CAPACITY_PENALTY_SHAPE == 'squared':
+        return min(-(-overload * overload // 60), CAPACITY_PENALTY_SQUARED_MAX)
+    return overload
+
+
+def calculate_score(devices: Iterable['Device']) -> Tuple[int, ...]:
+    """
+    Oblicza wynik (hard, soft) lub (hard, medium, soft) rozwiązania bez solvera, zgodnie z define_constraints w constraints.py:
+    - hard: -capacity_penalty(przekroczenie) za każdego technika, którego suma rbh_norma przekracza rbh_do_zaplanowania;
+      przy CAPACITY_PENALTY_LEVEL = 'medium' ta kara jest wynikiem medium, a hard to -1 za każdego takiego technika,
+    - soft: +1 za każde przypisane urządzenie oraz + minimalne dni_w_om urządzeń każdego technika.
+    Wynik jest sumą po technikach i urządzeniach, więc wyniki niezależnych części problemu można dodawać.
+    """
+    technicians = {}
+    loads: Dict[int, int] = {}
+    min_dni_w_om: Dict[int, float] = {}
+    assigned_count = 0
+    for device in devices:
+        technician = device.technician
+        if technician is None:
+            continue
+        assigned_count += 1
+        technicians[technician.id] = technician
+        loads[technician.id] = loads.get(technician.id, 0) + device.rbh_norma
+        min_dni_w_om[technician.id] = min(min_dni_w_om.get(technician.id, device.dni_w_om), device.dni_w_om)
+
+    overloads = [load - technicians[technician_id].rbh_do_zaplanowania for technician_id, load in loads.items()
+                 if load > technicians[technician_id].rbh_do_zaplanowania]
+    capacity_score = -sum(capacity_penalty(overload) for overload in overloads)
+    soft_score = assigned_count + sum(min_dni_w_om.values())
+    if CAPACITY_PENALTY_LEVEL == 'medium':
+        return -len(overloads), capacity_score, soft_score
+    return capacity_score, soft_score
+
+
+class DeviceScheduleScoreState:
+    """
+    Przyrostowe obliczanie wyniku zgodnego z define_constraints, bez wywołań funkcji ograniczeń przez solver
+    (metody IncrementalScoreCalculator bez zależności od Timefold, używane przez DeviceScheduleIncrementalScoreCalculator).
+    Stan jest trzymany per technik w tablicach NumPy (obciążenie, limit, kara za przekroczenie) oraz w licznikach
+    (przypisane urządzenia, przeciążeni technicy). Minimalne dni_w_om technika jest
+    utrzymywane przez Counter wartości i kopiec z leniwym usuwaniem, więc zmiana Device.technician aktualizuje tylko
+    jednego technika (O(1), dla minimum O(log n)) zamiast ponownego przeliczenia całego rozwiązania.
+    Zgodność IUM nie jest liczona w wyniku, zapewnia ją zakres wartości Device.eligible_technicians.
+    """
+
+    def reset_working_solution(self, solution: 'DeviceSchedule') -> None:
+        technicians = solution.technician_list
+        self._positions: Dict[int, int] = {technician.id: position for position, technician in enumerate(technicians)}
+        self._capacities = np.array([technician.rbh_do_zaplanowania for technician in technicians], dtype=np.int64)
+        self._loads = np.zeros(len(technicians), dtype=np.int64)
+        self._penalties = np.zeros(len(technicians), dtype=np.int64)
+        self._dni_heaps: List[list] = [[] for _ in technicians]
+        self._dni_counts: List[Counter] = [Counter() for _ in technicians]
+        self._overloaded_count = 0
+        self._capacity_penalty = 0
+        self._assigned_count = 0
+        self._min_dni_sum = 0.0
+        for device in solution.device_list:
+            self._insert(device)
+
+    def _min_dni(self, position: int):
+        heap, counts = self._dni_heaps[position], self._dni_counts[position]
+        while heap and heap[0] not in counts:
+            heapq.heappop(heap)
+        return heap[0] if heap else 0
+
+    def _apply(self, device: 'Device', sign: int):
+        technician = device.technician
+        if technician is None:
+            return
+        position = self._positions[technician.id]
+        min_dni_before = self._min_dni(position)
+        overloaded_before = self._loads[position] > self._capacities[position]
+
+        self._loads[position] += sign * device.rbh_norma
+        overload = int(self._loads[position] - self._capacities[position])
+        penalty = capacity_penalty(overload) if overload > 0 else 0
+        self._capacity_penalty += penalty - int(self._penalties[position])
+        self._penalties[position] = penalty
+        self._overloaded_count += int(overload > 0) - int(overloaded_before)
+
+        self._assigned_count += sign
+        self._update_dni(position, device.dni_w_om, sign)
+        self._min_dni_sum += self._min_dni(position) - min_dni_before
+
+    def _update_dni(self, position: int, dni_w_om, sign: int):
+        heap, counts = self._dni_heaps[position], self._dni_counts[position]
+        counts[dni_w_om] += sign
+        if counts[dni_w_om] == 0:
+            del counts[dni_w_om]
+            # Usunięte wartości zostają w kopcu do zdjęcia ze szczytu; kopiec jest odbudowywany, gdy za bardzo urośnie
+            if len(heap) > 2 * len(counts) + 8:
+                heap[:] = list(counts)
+                heapq.heapify(heap)
+        elif sign > 0 and counts[dni_w_om] == 1:
+            heapq.heappush(heap, dni_w_om)
+
+    def _insert(self, device: 'Device'):
+        self._apply(device, 1)
+
+    def _retract(self, device: 'Device'):
+        self._apply(device, -1)
+
+    def before_entity_added(self, entity) -> None:
+        pass
+
+    def after_entity_added(self, entity) -> None:
+        self._insert(entity)
+
+    def before_variable_changed(self, entity, variable_name: str) -> None:
+        if variable_name == 'technician':
+            self._retract(entity)
+
+    def after_variable_changed(self, entity, variable_name: str) -> None:
+        if variable_name == 'technician':
+            self._insert(entity)
+
+    def before_entity_removed(self, entity) -> None:
+        self._retract(entity)
+
+    def after_entity_removed(self, entity) -> None:
+        pass
+
+    def score_levels(self) -> Tuple[int, ...]:
+        """
+        Bieżący wynik jako krotka poziomów, w tej samej postaci co calculate_score.
+        """
+        soft_score = int(self._assigned_count + self._min_dni_sum)
+        if CAPACITY_PENALTY_LEVEL == 'medium':
+            return -self._overloaded_count, -self._capacity_penalty, soft_score
+        return -self._capacity_penalty, soft_score
@@ -7,6 +7,25 @@ LOGIS_DIRECTORY = os.path.join(PROJECT_ROOT, 'Logis')  # place for define the Lo
 PYTHON_32BIT_INTERPRETER = os.path.join(PROJECT_ROOT, 'venv32/Scripts/python')
 ODBC_READ_SCRIPT_PATH = os.path.join(PROJECT_ROOT, 'tools/dbf_to_csv_transformation_32bit.py')
 CSV_FILES_PATH = os.path.join(PROJECT_ROOT, 'tools/CSV_files')
+TABLE_CACHE_PATH = os.path.join(CSV_FILES_PATH, 'cache')  # tables cached by DataLoader between runs
+PROBLEM_SNAPSHOT_PATH = os.path.join(CSV_FILES_PATH, 'problem_snapshot.npz')  # prepared technicians and devices, see problem_snapshot
+
+# Backend used by DataLoader: 'odbc' (32-bit subprocess and CSV) or 'native' (in-process DBF/FPT reader)
+DATA_LOADER_BACKEND = 'odbc'
+DBF_ENCODING = 'cp1250'  # used when the DBF header does not define a code page
+DBF_INCLUDE_DELETED = True  # consistent with Deleted=No in CONNECTION_STRING
+USE_TABLE_CACHE = True  # reuse tables cached in TABLE_CACHE_PATH until the source DBF file changes
+DATA_LOADER_MAX_WORKERS = 4  # tables loaded concurrently by DataLoader.prefetch
+# Append-only tables refreshed with the native backend by reading only new records. Edits of existing records made
+# together with appends are not detected, so tables edited in place must not be listed: ksiazka_k is not append-only,
+# its k_do_datap and k_do_k_n (filters of DevicesDataProcessor) change when a device is taken from BOK.
+DELTA_REFRESH_TABLES = ['bok', 'bok_arch']
+
+# Export mode of the 32-bit ODBC script: 'stream' writes fetchmany batches as they arrive, 'full' uses fetchall
+ODBC_EXPORT_MODE = 'stream'
+ODBC_FETCH_BATCH_SIZE = 10000
+# Hand-off format between the 32-bit ODBC script and the 64-bit loader: 'columnar' (typed binary, see columnar_format) or 'csv'
+ODBC_INTERCHANGE_FORMAT = 'columnar'
 
 # Base directory for DBF files, make sure the path is valid and accessible
 CONNECTION_STRING = 'DSN=VisualFoxProDSN;SourceDB={directory};Exclusive=No;BackgroundFetch=Yes;Collate=Machine;Null=Yes;Deleted=No;'
@@ -73,6 +92,17 @@ STRING_COLUMN_LIST = [
     'u_nazwa_s'      # Device User name
 ]
 
+# Columns loaded as pandas categoricals with dictionaries shared across tables when USE_CATEGORICAL_COLUMNS is set
+USE_CATEGORICAL_COLUMNS = False
+CATEGORICAL_COLUMN_LIST = [
+    'indeks',        # Index identifier
+    'ium',           # IUM identifier
+    'pr_id',         # PR identifier
+    'u_nazwa_s',     # Device User name
+    'k_do_nazw',     # Name of the technician the device is assigned to
+    'p_typ'          # Device type
+]
+
 # Columns to be treated as numeric values
 NUMERIC_COLUMN_LIST = [
     'l_norma_p'      # Personnel norm value
@@ -94,6 +124,45 @@ DBF_PATHS = {**dbf_paths_dane, **dbf_paths_dane_sim}
 ###  CONSTANTS FOR TIMEFOLD
 INDEX_PRACOWNI = '9111497111'  # '9111497117'  '9111497111' '9111497311' to select technician and devices from the same unit of organization
 
+# Run mode of tools/main.py:
+# 'single' - one solver thread, 'multithreaded' - solver with SOLVER_THREAD_COUNT move threads
+# (requires timefold-enterprise, otherwise falls back to 'single'), 'partitioned' - components solved in parallel processes
+# with the fixed COMPONENT_* limits instead of the termination policy below
+SOLVER_RUN_MODE = 'single'
+SOLVER_THREAD_COUNT = os.cpu_count() or 1  # move threads or processes used by the run mode
+SOLVER_SPENT_LIMIT_MINUTES = 4 * 60  # time limit of the 'single' and 'multithreaded' modes
+SOLVER_RUNS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'solver_runs')  # score timelines of runs
+
+# Termination policy of the 'single' and 'multithreaded' modes (tools/termination.py), None disables a condition
+TERMINATION_UNIMPROVED_MINUTES = 30  # stop after this time without a better score
+TERMINATION_UNIMPROVED_STEP_COUNT = None  # stop after this many steps without a better score
+TERMINATION_BEST_SCORE_LIMIT = None  # known good score, e.g. "0hard/978soft", stop when it is reached
+TERMINATION_FEASIBLE_PLATEAU_MINUTES = 10  # once hard score is 0, stop after this time without a better soft score
+
+# Score calculation of the solver: 'constraint_streams' (define_constraints in tools/constraints.py) or 'incremental'
+# (DeviceScheduleIncrementalScoreCalculator in tools/score_calculator.py, same score without constraint stream lambdas)
+SCORE_DIRECTOR = 'constraint_streams'
+
+# Profiling of the Python functions of every constraint (tools/constraint_profiler.py), adds overhead to every call
+PROFILE_CONSTRAINTS = False
+CONSTRAINT_PROFILE_FORMAT = 'table'  # 'table' or 'json'
+
+# Penalty for technicians assigned more minutes than rbh_do_zaplanowania (tools/constraints.py)
+# 'count' - 1 per overloaded technician, 'linear' - overload in minutes,
+# 'squared' - overload in minutes times overload in hours (rounded up), at most CAPACITY_PENALTY_SQUARED_MAX
+CAPACITY_PENALTY_SHAPE = 'count'  # 'count' is the production penalty until benchmark_capacity.py results justify a change
+# Limit of the 'squared' penalty of one technician (reached at about 129 h of overload),
+# keeps the sum over up to 2000 technicians within a 32-bit int score
+CAPACITY_PENALTY_SQUARED_MAX = 1_000_000
+# 'hard' - the shaped penalty is the hard score, 'medium' - hard score counts overloaded technicians
+# and the shaped penalty is a medium score (HardMediumSoftScore)
+CAPACITY_PENALTY_LEVEL = 'hard'
+
+# Decomposition of the problem into components connected by shared IUM (tools/decomposition.py)
+EXACT_SOLVE_MAX_COMBINATIONS = 4096  # components with at most this many assignments are solved by full enumeration
+COMPONENT_SPENT_LIMIT_SECONDS = 5 * 60  # time limit of the solver for one component
+COMPONENT_UNIMPROVED_SECONDS = 30  # stop solving a component after this time without a better solution
+
 # Example usage:
 if __name__ == "__main__":
     for key, value in DBF_PATHS.items():
@@ -0,0 +1,33 @@
+from timefold.solver.config import SolverConfig, ScoreDirectorFactoryConfig, TerminationConfig, MoveThreadCount
+from constraints import define_constraints
+from domain import DeviceSchedule, Device
+from score_calculator import DeviceScheduleIncrementalScoreCalculator
+from settings import SCORE_DIRECTOR
+
+
+def create_solver_config(termination_config: TerminationConfig,
+                         move_thread_count: int | MoveThreadCount = MoveThreadCount.NONE,
+                         constraint_provider_function=define_constraints,
+                         score_director: str = SCORE_DIRECTOR) -> SolverConfig:
+    """
+    Konfiguracja solvera dla problemu przydziału urządzeń do techników z podanym warunkiem zakończenia.
+    move_thread_count > 1 włącza wielowątkowe ocenianie ruchów (tylko z timefold-enterprise).
+    constraint_provider_function pozwala podać inny zestaw ograniczeń, np. profilowany przez ConstraintProfiler.
+    Przy score_director = 'incremental' (domyślnie SCORE_DIRECTOR) wynik liczy DeviceScheduleIncrementalScoreCalculator,
+    a ograniczenia nie są używane; 'constraint_streams' wymusza ograniczenia niezależnie od ustawień.
+    """
+    if score_director == 'incremental':
+        score_director_factory_config = ScoreDirectorFactoryConfig(
+            incremental_score_calculator_class=DeviceScheduleIncrementalScoreCalculator
+        )
+    else:
+        score_director_factory_config = ScoreDirectorFactoryConfig(
+            constraint_provider_function=constraint_provider_function  # Włączanie ograniczeń
+        )
+    return SolverConfig(
+        solution_class=DeviceSchedule,
+        entity_class_list=[Device],
+        score_director_factory_config=score_director_factory_config,
+        termination_config=termination_config,
+        move_thread_count=move_thread_count
+    )
@@ -0,0 +1,169 @@
+from typing import Optional
+from dataclasses import dataclass, asdict
+from datetime import date
+import json
+import os
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from tools.DBF_Reader_Native import read_dbf_header, DBFWatermark
+from tools.settings import TABLE_CACHE_PATH
+
+CACHE_FORMAT_VERSION = 1
+
+
+@dataclass(frozen=True)
+class SourceFingerprint:
+    """
+    Identifies the state of a source DBF file: modification time, size and the record count from its header.
+    """
+    mtime_ns: int
+    size: int
+    record_count: int
+
+    @classmethod
+    def of(cls, dbf_file_path: str) -> 'SourceFingerprint':
+        """
+        Builds the fingerprint of the given DBF file.
+
+        Params:
+        dbf_file_path: str, the path to the DBF file.
+
+        Returns:
+        SourceFingerprint of the file in its current state.
+        """
+        stat = os.stat(dbf_file_path)
+        return cls(mtime_ns=stat.st_mtime_ns, size=stat.st_size, record_count=read_dbf_header(dbf_file_path).record_count)
+
+
+class TableCache:
+    """
+    Class TableCache stores loaded tables on disk together with the fingerprint of their source DBF file,
+    so unchanged tables can be reused across runs instead of being extracted again.
+    Each table is kept as a pickled DataFrame (<key>.pkl) with a JSON metadata file (<key>.json)
+    and, for tables refreshed incrementally, the deleted flags of its watermark (<key>.deleted.npy).
+    """
+
+    def __init__(self, cache_dir: str = TABLE_CACHE_PATH, backend: str = ''):
+        """
+        Constructor for the TableCache class.
+
+        Params:
+        cache_dir: str, the directory for the cached tables.
+        backend: str, the DataLoader backend; tables cached by a different backend are not reused.
+        """
+        self.cache_dir = cache_dir
+        self.backend = backend
+
+    def _paths(self, key: str):
+        return os.path.join(self.cache_dir, f"{key}.pkl"), os.path.join(self.cache_dir, f"{key}.json")
+
+    def _deleted_flags_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.deleted.npy")
+
+    def read_metadata(self, key: str) -> Optional[dict]:
+        """
+        Reads the metadata of a cached table.
+
+        Params:
+        key: str, the key of the table.
+
+        Returns:
+        Dictionary with the metadata or None if the table is not cached.
+        """
+        _, metadata_path = self._paths(key)
+        try:
+            with open(metadata_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def load(self, key: str, fingerprint: SourceFingerprint) -> Optional[DataFrame]:
+        """
+        Returns the cached table if it was stored for the same source fingerprint, otherwise None.
+
+        Params:
+        key: str, the key of the table.
+        fingerprint: SourceFingerprint, the current fingerprint of the source DBF file.
+
+        Returns:
+        Cached DataFrame or None.
+        """
+        metadata = self.read_metadata(key)
+        if metadata is None or metadata.get('fingerprint') != asdict(fingerprint):
+            return None
+        return self.load_stale(key)
+
+    def load_stale(self, key: str) -> Optional[DataFrame]:
+        """
+        Returns the cached table regardless of the state of its source, e.g. as a base for an incremental refresh.
+
+        Params:
+        key: str, the key of the table.
+
+        Returns:
+        Cached DataFrame or None if there is no usable entry.
+        """
+        metadata = self.read_metadata(key)
+        if metadata is None or metadata.get('version') != CACHE_FORMAT_VERSION or metadata.get('backend') != self.backend:
+            return None
+        data_path, _ = self._paths(key)
+        try:
+            return pd.read_pickle(data_path)
+        except Exception as e:
+            print(f"Cannot read cached table {key}: {e}")
+            return None
+
+    def load_watermark(self, key: str) -> Optional[DBFWatermark]:
+        """
+        Returns the watermark stored with the cached table, or None if the table was stored without it.
+
+        Params:
+        key: str, the key of the table.
+
+        Returns:
+        DBFWatermark of the cached table or None.
+        """
+        metadata = self.read_metadata(key)
+        if metadata is None or 'watermark' not in metadata:
+            return None
+        try:
+            deleted = np.load(self._deleted_flags_path(key))
+        except (OSError, ValueError):
+            return None
+        watermark = metadata['watermark']
+        last_update = date.fromisoformat(watermark['last_update']) if watermark['last_update'] else None
+        return DBFWatermark(record_count=watermark['record_count'], record_length=watermark['record_length'],
+                            last_update=last_update, deleted=deleted, modified_ns=watermark.get('modified_ns'))
+
+    def store(self, key: str, fingerprint: SourceFingerprint, df: DataFrame,
+              watermark: Optional[DBFWatermark] = None, **extra_metadata):
+        """
+        Stores the table with the fingerprint of the source it was read from.
+        The metadata is removed first and written last, so an interrupted write never leaves a valid-looking entry.
+
+        Params:
+        key: str, the key of the table.
+        fingerprint: SourceFingerprint, the fingerprint taken before the table was read.
+        df: DataFrame, the table to store.
+        watermark: DBFWatermark, optional state of the source used for incremental refreshes.
+        extra_metadata: additional values saved in the metadata file.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        data_path, metadata_path = self._paths(key)
+        metadata = {'version': CACHE_FORMAT_VERSION, 'backend': self.backend, 'fingerprint': asdict(fingerprint),
+                    'rows': len(df), **extra_metadata}
+        if os.path.exists(metadata_path):
+            os.remove(metadata_path)
+        df.to_pickle(f"{data_path}.part")
+        os.replace(f"{data_path}.part", data_path)
+        if watermark is not None:
+            metadata['watermark'] = {'record_count': watermark.record_count, 'record_length': watermark.record_length,
+                                     'last_update': watermark.last_update.isoformat() if watermark.last_update else None,
+                                     'modified_ns': watermark.modified_ns}
+            with open(f"{self._deleted_flags_path(key)}.part", 'wb') as file:
+                np.save(file, watermark.deleted)
+            os.replace(f"{self._deleted_flags_path(key)}.part", self._deleted_flags_path(key))
+        with open(f"{metadata_path}.part", 'w', encoding='utf-8') as file:
+            json.dump(metadata, file)
+        os.replace(f"{metadata_path}.part", metadata_path)
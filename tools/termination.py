@@ -0,0 +1,149 @@
+from typing import List, Optional, Tuple
+from dataclasses import dataclass
+import json
+import os
+import re
+import time
+from timefold.solver.config import TerminationConfig, TerminationCompositionStyle, Duration
+from settings import SOLVER_SPENT_LIMIT_MINUTES, TERMINATION_UNIMPROVED_MINUTES, TERMINATION_UNIMPROVED_STEP_COUNT, \
+    TERMINATION_BEST_SCORE_LIMIT, TERMINATION_FEASIBLE_PLATEAU_MINUTES
+
+# Zapas na różnicę między czasem mierzonym przez solver a czasem mierzonym w Pythonie
+TIME_TOLERANCE_SECONDS = 1.0
+
+
+def score_levels(score) -> Tuple[int, ...]:
+    """
+    Poziomy wyniku Timefold jako krotka: (hard, soft) lub (hard, medium, soft).
+    """
+    if hasattr(score, 'medium_score'):
+        return score.hard_score, score.medium_score, score.soft_score
+    return score.hard_score, score.soft_score
+
+
+def format_score(levels: Tuple[int, ...]) -> str:
+    """
+    Zapis krotki poziomów wyniku jak w Timefold, np. "0hard/978soft".
+    """
+    names = ('hard', 'medium', 'soft') if len(levels) == 3 else ('hard', 'soft')
+    return '/'.join(f"{level}{name}" for level, name in zip(levels, names))
+
+
+class ScoreTimeline:
+    """
+    Czas (w sekundach od startu) znalezienia kolejnych najlepszych wyników jednego uruchomienia.
+    Punkt to (sekundy, *poziomy wyniku).
+    """
+
+    def __init__(self, points: Optional[List[Tuple[float, ...]]] = None):
+        self.start = time.perf_counter()
+        self.points = points or []
+
+    def record(self, score):
+        self.points.append((time.perf_counter() - self.start, *score_levels(score)))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def final_score(self) -> Optional[Tuple[int, ...]]:
+        return tuple(self.points[-1][1:]) if self.points else None
+
+    def last_improvement(self) -> float:
+        return self.points[-1][0] if self.points else 0.0
+
+    def time_to_reach(self, score: Tuple[int, ...]) -> Optional[float]:
+        """
+        Czas znalezienia pierwszego wyniku nie gorszego niż score, None jeśli nie został osiągnięty.
+        """
+        return next((point[0] for point in self.points if tuple(point[1:]) >= score), None)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(self.points, file)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['ScoreTimeline']:
+        if not os.path.exists(path):
+            return None
+        with open(path) as file:
+            return cls([tuple(point) for point in json.load(file)])
+
+
+def parse_score(text: str) -> Tuple[int, ...]:
+    """
+    Zamienia wynik w zapisie Timefold, np. "0hard/978soft", na krotkę (0, 978).
+    """
+    return tuple(int(value) for value in re.findall(r'(-?\d+)[a-z]+', text))
+
+
+@dataclass
+class TerminationPolicy:
+    """
+    Warunki zakończenia długiego uruchomienia solvera; solver kończy pracę po spełnieniu pierwszego z nich.
+    Warunek ustawiony na None jest pomijany.
+    - spent_limit_minutes: maksymalny czas pracy,
+    - unimproved_minutes: czas bez poprawy najlepszego wyniku,
+    - unimproved_step_count: liczba kroków bez poprawy najlepszego wyniku,
+    - best_score_limit: wynik docelowy, np. "0hard/978soft", po którego osiągnięciu dalsze szukanie nie jest potrzebne,
+    - feasible_plateau_minutes: po znalezieniu rozwiązania dopuszczalnego (hard = 0) czas bez poprawy wyniku soft.
+    """
+    spent_limit_minutes: Optional[float] = SOLVER_SPENT_LIMIT_MINUTES
+    unimproved_minutes: Optional[float] = TERMINATION_UNIMPROVED_MINUTES
+    unimproved_step_count: Optional[int] = TERMINATION_UNIMPROVED_STEP_COUNT
+    best_score_limit: Optional[str] = TERMINATION_BEST_SCORE_LIMIT
+    feasible_plateau_minutes: Optional[float] = TERMINATION_FEASIBLE_PLATEAU_MINUTES
+
+    def to_config(self) -> TerminationConfig:
+        """
+        Buduje TerminationConfig łączący wszystkie ustawione warunki (OR).
+        Warunek plateau to złożenie AND: najlepszy wynik dopuszczalny i brak poprawy przez feasible_plateau_minutes.
+        """
+        terminations = []
+        if self.spent_limit_minutes is not None:
+            terminations.append(TerminationConfig(spent_limit=_duration(self.spent_limit_minutes)))
+        if self.unimproved_minutes is not None:
+            terminations.append(TerminationConfig(unimproved_spent_limit=_duration(self.unimproved_minutes)))
+        if self.unimproved_step_count is not None:
+            terminations.append(TerminationConfig(unimproved_step_count_limit=self.unimproved_step_count))
+        if self.best_score_limit is not None:
+            terminations.append(TerminationConfig(best_score_limit=self.best_score_limit))
+        if self.feasible_plateau_minutes is not None:
+            terminations.append(TerminationConfig(
+                termination_config_list=[
+                    TerminationConfig(best_score_feasible=True),
+                    TerminationConfig(unimproved_spent_limit=_duration(self.feasible_plateau_minutes))
+                ],
+                termination_composition_style=TerminationCompositionStyle.AND
+            ))
+        return TerminationConfig(termination_config_list=terminations,
+                                 termination_composition_style=TerminationCompositionStyle.OR)
+
+    def stop_reason(self, timeline: ScoreTimeline, terminated_early: bool = False) -> str:
+        """
+        Ustala, który warunek zakończył uruchomienie, na podstawie czasu pracy i czasów kolejnych najlepszych wyników.
+        Timefold nie podaje przyczyny zakończenia, a liczba kroków nie jest dostępna w Pythonie, więc limit kroków
+        jest wskazywany, gdy żaden z warunków czasowych ani wynikowych nie jest spełniony.
+        """
+        if terminated_early:
+            return "terminated early"
+        elapsed = timeline.elapsed()
+        unimproved = elapsed - timeline.last_improvement() + TIME_TOLERANCE_SECONDS
+        final_score = timeline.final_score()
+        if self.best_score_limit is not None and final_score is not None \
+                and final_score >= parse_score(self.best_score_limit):
+            return f"target score {self.best_score_limit} reached"
+        if self.feasible_plateau_minutes is not None and final_score is not None and final_score[0] >= 0 \
+                and unimproved >= self.feasible_plateau_minutes * 60:
+            return f"feasible solution without improvement for {self.feasible_plateau_minutes} min"
+        if self.unimproved_minutes is not None and unimproved >= self.unimproved_minutes * 60:
+            return f"no improvement for {self.unimproved_minutes} min"
+        if self.spent_limit_minutes is not None and elapsed + TIME_TOLERANCE_SECONDS >= self.spent_limit_minutes * 60:
+            return f"time limit of {self.spent_limit_minutes} min"
+        if self.unimproved_step_count is not None:
+            return f"no improvement for {self.unimproved_step_count} steps"
+        return "all solver phases finished"
+
+
+def _duration(minutes: float) -> Duration:
+    return Duration(seconds=round(minutes * 60))
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Moduły w tools importują się nawzajem bez pakietu (from domain import ...), jak przy uruchomieniu z katalogu tools
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,105 @@
+"""
+Zgodność przyrostowego wyniku (DeviceScheduleScoreState, DeviceScheduleIncrementalScoreCalculator) z pełnym
+przeliczeniem calculate_score i z ograniczeniami define_constraints na małym problemie w pamięci.
+"""
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import List, Optional, Set
+import random
+import pytest
+import scoring
+from scoring import DeviceScheduleScoreState, calculate_score
+
+SHAPES = ('count', 'linear', 'squared')
+LEVELS = ('hard', 'medium')
+
+
+@dataclass(eq=False)
+class Technician:
+    id: int
+    rbh_do_zaplanowania: int
+    iums: Set[str]
+
+    def has_ium(self, ium: str) -> bool:
+        return ium in self.iums
+
+
+@dataclass(eq=False)
+class Device:
+    index: int
+    ium: str
+    rbh_norma: int
+    dni_w_om: float
+    eligible_technicians: List[Technician] = field(default_factory=list)
+    technician: Optional[Technician] = None
+
+
+def build_problem(seed: int, technician_class=Technician, device_factory=Device):
+    """
+    Mały problem: 6 techników z losowymi IUM i limitami oraz 60 urządzeń z losowym przydziałem początkowym.
+    """
+    rng = random.Random(seed)
+    technicians = [technician_class(index, rng.randint(60, 600), {str(rng.randint(0, 4)) for _ in range(2)})
+                   for index in range(6)]
+    devices = [device_factory(index, str(rng.randint(0, 4)), rng.randint(10, 240), float(rng.randint(0, 30)))
+               for index in range(60)]
+    for device in devices:
+        device.eligible_technicians = [technician for technician in technicians if technician.has_ium(device.ium)]
+        device.technician = rng.choice(device.eligible_technicians + [None])
+    return technicians, devices
+
+
+def random_moves(rng: random.Random, devices, calculator, count: int):
+    """
+    Zmiany technika pojedynczych urządzeń (na uprawnionego lub brak), z powiadomieniem kalkulatora.
+    """
+    for _ in range(count):
+        device = rng.choice(devices)
+        calculator.before_variable_changed(device, 'technician')
+        device.technician = rng.choice(device.eligible_technicians + [None])
+        calculator.after_variable_changed(device, 'technician')
+        yield device
+
+
+@pytest.mark.parametrize('level', LEVELS)
+@pytest.mark.parametrize('shape', SHAPES)
+def test_incremental_score_matches_calculate_score(monkeypatch, shape, level):
+    monkeypatch.setattr(scoring, 'CAPACITY_PENALTY_SHAPE', shape)
+    monkeypatch.setattr(scoring, 'CAPACITY_PENALTY_LEVEL', level)
+    technicians, devices = build_problem(seed=0)
+    calculator = DeviceScheduleScoreState()
+    calculator.reset_working_solution(SimpleNamespace(technician_list=technicians, device_list=devices))
+    assert calculator.score_levels() == calculate_score(devices)
+    for step, device in enumerate(random_moves(random.Random(1), devices, calculator, 2000)):
+        assert calculator.score_levels() == calculate_score(devices), f"move {step} of device {device.index}"
+
+
+def test_incremental_score_matches_constraint_streams():
+    pytest.importorskip('timefold.solver')
+    try:
+        import domain
+    except Exception as error:  # Timefold bez JVM w wersji 17+ nie pozwala zdefiniować klas planowania
+        pytest.skip(f"Timefold domain is not available: {error}")
+    from timefold.solver import SolverFactory, SolutionManager
+    from timefold.solver.config import TerminationConfig
+    from constraints import define_constraints
+    from score_calculator import DeviceScheduleIncrementalScoreCalculator
+    from solver_config import create_solver_config
+    from termination import score_levels
+
+    def device_factory(index, ium, rbh_norma, dni_w_om):
+        return domain.Device(index, ium, f"device {index}", "typ", "nr", rbh_norma, dni_w_om, "uzytkownik")
+
+    technicians, devices = build_problem(
+        seed=0, technician_class=lambda index, capacity, iums: domain.Technician(index, f"technician {index}",
+                                                                                 capacity, 0, iums),
+        device_factory=device_factory)
+    solution = domain.DeviceSchedule("test", technicians, devices)
+    solver_config = create_solver_config(TerminationConfig(), constraint_provider_function=define_constraints,
+                                         score_director='constraint_streams')
+    solution_manager = SolutionManager.create(SolverFactory.create(solver_config))
+    calculator = DeviceScheduleIncrementalScoreCalculator()
+    calculator.reset_working_solution(solution)
+    for step, device in enumerate(random_moves(random.Random(1), devices, calculator, 200)):
+        assert calculator.score_levels() == score_levels(solution_manager.update(solution)), \
+            f"move {step} of device {device.index}"